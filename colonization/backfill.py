@@ -0,0 +1,187 @@
+import glob
+import heapq
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from os import path
+from typing import Any, Callable, Iterator
+
+from EDMCLogging import get_main_logger
+
+from .persistence import atomic_write
+
+logger = get_main_logger()
+
+REPLAY_EVENTS = frozenset((
+    'ColonisationConstructionDepot', 'ColonisationContribution', 'CargoTransfer', 'MarketBuy', 'MarketSell'))
+STATE_EVENTS = frozenset(('Location', 'Docked', 'Undocked'))
+MARKERS = tuple(f'"{event}"'.encode() for event in REPLAY_EVENTS | STATE_EVENTS)
+
+
+def journal_timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def journal_epoch(timestamp: str) -> float:
+    return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+
+
+Events = list[tuple[str, dict[str, Any]]]
+
+
+class JournalBackfill:
+    WORKERS = 4
+
+    def __init__(self) -> None:
+        self.journalDir: str | None = None
+        self.checkpointPath: str | None = None
+        self.file: str | None = None
+        self.offset: int = 0
+        self.timestamp: str | None = None
+        # [first, last] journal timestamps handled live, one pair per EDMC session
+        self.sessions: list[list[str]] = []
+        self._live: list[str] | None = None
+        self.state: dict[str, Any] = {'StationName': None, 'SystemName': None, 'MarketID': None}
+
+    def load(self, journal_dir: str | None, checkpoint_path: str, baseline: float | None = None) -> None:
+        self.journalDir = journal_dir
+        self.checkpointPath = checkpoint_path
+        if path.isfile(checkpoint_path):
+            data = json.load(open(checkpoint_path, 'r', encoding='utf-8'))
+            self.file = data.get('file')
+            self.offset = data.get('offset', 0)
+            self.timestamp = data.get('timestamp')
+            self.sessions = data.get('sessions', [])
+            self.state.update(data.get('state', {}))
+        elif baseline is not None:
+            # state saved before the first backfill already reflects everything up to its last write
+            self.timestamp = journal_timestamp(baseline)
+
+    def save(self) -> None:
+        if self.checkpointPath is None:
+            return
+        atomic_write(self.checkpointPath, json.dumps(
+            {'file': self.file, 'offset': self.offset, 'timestamp': self.timestamp, 'sessions': self.sessions,
+             'state': self.state}, indent=4))
+
+    def seen(self, timestamp: str | None) -> None:
+        if not timestamp:
+            return
+        if self._live is None:
+            self._live = [timestamp, timestamp]
+            self.sessions.append(self._live)
+        elif timestamp > self._live[1]:
+            self._live[1] = timestamp
+
+    def handled_live(self, timestamp: str) -> bool:
+        return any(first <= timestamp <= last for first, last in self.sessions)
+
+    def run(self, apply: Callable[[dict[str, Any], dict[str, Any]], None]) -> int:
+        files = self._files()
+        if not files:
+            return 0
+        offsets: dict[str, int] = {}
+
+        state = self.state
+        high_water = self.timestamp
+        last = high_water or ''
+        applied = 0
+        for timestamp, entry in self._merged(files, offsets):
+            if entry['event'] in STATE_EVENTS:
+                self._update_state(state, entry)
+                continue
+            last = max(last, timestamp)
+            # only gaps between live sessions hold missed events
+            if (high_water and timestamp <= high_water) or self.handled_live(timestamp):
+                continue
+            apply(entry, state)
+            applied += 1
+
+        self.file = path.basename(files[-1])
+        self.offset = offsets[files[-1]]
+        if last:
+            self.timestamp = last
+            self.sessions = [s for s in self.sessions if s is self._live or s[1] > last]
+        logger.info("Backfill replayed %d journal events from %d files", applied, len(files))
+        return applied
+
+    def _files(self) -> list[str]:
+        if not self.journalDir or not path.isdir(self.journalDir):
+            return []
+        files = sorted(glob.glob(path.join(self.journalDir, 'Journal.*.log')))
+        if self.file:
+            files = [f for f in files if path.basename(f) >= self.file]
+        return files
+
+    def _merged(self, files: list[str], offsets: dict[str, int]) -> Iterator[tuple[str, dict[str, Any]]]:
+        heap: list[tuple[str, int, int, Events]] = []
+        with ThreadPoolExecutor(self.WORKERS) as pool:
+            for n, events in enumerate(self._scans(pool, files, offsets)):
+                if not events:
+                    continue
+                # a journal never holds events from before its first one, so anything up to that is final
+                while heap and heap[0][0] <= events[0][0]:
+                    yield self._pop(heap)
+                heapq.heappush(heap, (events[0][0], n, 0, events))
+        while heap:
+            yield self._pop(heap)
+
+    def _scans(self, pool: ThreadPoolExecutor, files: list[str], offsets: dict[str, int]) -> Iterator[Events]:
+        # files are scanned in parallel, at most WORKERS of them ahead of the merge
+        queued = iter(files)
+        pending: deque[Future[Events]] = deque(
+            pool.submit(self._scan, f, offsets) for f in islice(queued, self.WORKERS))
+        while pending:
+            events = pending.popleft().result()
+            following = next(queued, None)
+            if following is not None:
+                pending.append(pool.submit(self._scan, following, offsets))
+            yield events
+
+    @staticmethod
+    def _pop(heap: list[tuple[str, int, int, Events]]) -> tuple[str, dict[str, Any]]:
+        _, n, i, events = heapq.heappop(heap)
+        if i + 1 < len(events):
+            heapq.heappush(heap, (events[i + 1][0], n, i + 1, events))
+        return events[i]
+
+    def _scan(self, file_path: str, offsets: dict[str, int]) -> Events:
+        offset = self.offset if path.basename(file_path) == self.file else 0
+        events: Events = []
+        for line, offset in self._lines(file_path, offset):
+            if not any(marker in line for marker in MARKERS):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('event') in REPLAY_EVENTS or entry.get('event') in STATE_EVENTS:
+                events.append((entry.get('timestamp', ''), entry))
+        offsets[file_path] = offset
+        return events
+
+    @staticmethod
+    def _lines(file_path: str, offset: int) -> Iterator[tuple[bytes, int]]:
+        with open(file_path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                yield line, offset
+
+    @staticmethod
+    def _update_state(state: dict[str, Any], entry: dict[str, Any]) -> None:
+        if entry['event'] == 'Undocked':
+            state['StationName'] = None
+            state['MarketID'] = None
+            return
+        if entry['event'] == 'Location' and not entry.get('Docked'):
+            state['StationName'] = None
+            state['MarketID'] = None
+        else:
+            state['StationName'] = entry.get('StationName')
+            state['MarketID'] = entry.get('MarketID')
+        state['SystemName'] = entry.get('StarSystem')
@@ -0,0 +1,66 @@
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from EDMCLogging import get_main_logger
+
+logger = get_main_logger()
+
+Fetch = Callable[[str, float], Any]
+
+
+class CarrierFetch:
+    TIMEOUT = 10.0
+    RETRIES = 2
+    BACKOFF = 1.0
+
+    def __init__(self, timeout: float = TIMEOUT, retries: int = RETRIES, backoff: float = BACKOFF) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deduplicated = 0
+        self.results: queue.Queue[tuple[Any, Exception | None]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def request(self, url: str, fetch: Fetch) -> bool:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self.deduplicated += 1
+                return False
+            self._thread = threading.Thread(target=self._run, args=(url, fetch), name="colonization-capi",
+                                            daemon=True)
+            self._thread.start()
+        return True
+
+    def join(self, timeout: float | None = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def drain(self) -> list[tuple[Any, Exception | None]]:
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _run(self, url: str, fetch: Fetch) -> None:
+        error: Exception | None = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.results.put((fetch(url, self.timeout), None))
+                return
+            except Exception as e:  # pylint: disable=W0718
+                error = e
+                logger.warning("Fleet carrier cAPI request failed (attempt %d): %s", attempt + 1, e)
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        self.results.put((None, error))
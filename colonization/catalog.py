@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import time
+from os import path
+from typing import Any
+
+from EDMCLogging import get_main_logger
+
+from .data import Commodity
+from .persistence import atomic_write
+
+logger = get_main_logger()
+
+
+class CommodityCatalog:
+    VERSION = 2
+
+    def __init__(self, plugin_dir: str, app_dir: str, save_dir: str | None = None) -> None:
+        self.pluginDir = plugin_dir
+        self.appDir = app_dir
+        self.saveDir = save_dir
+        self.lastLoadTime: float = 0.0
+        self.fromCache = False
+
+    def load(self, language: str) -> dict[str, Commodity]:
+        start = time.perf_counter()
+        key = self._key(language)
+        commodities = self._read_cache(language, key)
+        self.fromCache = commodities is not None
+        if commodities is None:
+            commodities = self._compile(language)
+            self._write_cache(language, key, commodities)
+        self.lastLoadTime = time.perf_counter() - start
+        logger.debug("Commodity catalog %s in %.1f ms", "read from cache" if self.fromCache else "compiled",
+                     self.lastLoadTime * 1000)
+        return commodities
+
+    def sources(self, language: str) -> list[str]:
+        sorting = path.join(self.pluginDir, 'L10n', f"sorting-{language}.csv")
+        if not path.isfile(sorting):
+            sorting = path.join(self.pluginDir, 'L10n', "sorting-en.csv")
+        return [path.join(self.appDir, 'FDevIDs', 'commodity.csv'),
+                path.join(self.appDir, 'FDevIDs', 'rare_commodity.csv'),
+                sorting]
+
+    def _key(self, language: str) -> dict[str, Any]:
+        files = []
+        for source in self.sources(language):
+            if path.isfile(source):
+                stat = os.stat(source)
+                files.append([source, stat.st_mtime_ns, stat.st_size])
+        return {'version': self.VERSION, 'language': language, 'sources': files}
+
+    def _cache_path(self, language: str) -> str | None:
+        if self.saveDir is None:
+            return None
+        return path.join(self.saveDir, f"commodities-{language}.json")
+
+    def _read_cache(self, language: str, key: dict[str, Any]) -> dict[str, Commodity] | None:
+        cache_path = self._cache_path(language)
+        if cache_path is None or not path.isfile(cache_path):
+            return None
+        try:
+            data = json.load(open(cache_path, 'r', encoding='utf-8'))
+        except ValueError:
+            return None
+        if data.get('key') != key:
+            return None
+        commodities = (Commodity.from_dict(c) for c in data['commodities'])
+        return {c.symbol.lower(): c for c in commodities}
+
+    def _write_cache(self, language: str, key: dict[str, Any], commodities: dict[str, Commodity]) -> None:
+        cache_path = self._cache_path(language)
+        if cache_path is None:
+            return
+        rows = [c.to_dict() for c in commodities.values()]
+        try:
+            atomic_write(cache_path, json.dumps({'key': key, 'commodities': rows}, ensure_ascii=False))
+        except OSError:
+            logger.exception("Cannot write commodity catalog cache %s", cache_path)
+
+    def _compile(self, language: str) -> dict[str, Commodity]:
+        commodities: dict[str, Commodity] = {}
+        fdev_commodities, fdev_rare, sorting = self.sources(language)
+        for f in (fdev_commodities, fdev_rare):
+            if not path.isfile(f):
+                continue
+            with open(f, 'r') as csvfile:
+                reader = csv.DictReader(csvfile)
+                for row in reader:
+                    symbol = row['symbol']
+                    commodities[symbol.lower()] = Commodity(symbol, row['category'], row['name'])
+
+        if path.isfile(sorting):
+            with open(sorting, mode='r', encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile)
+                category = ''
+                for row in reader:
+                    symbol = row['symbol'].strip()
+                    if symbol == '*':
+                        category = row['name'].strip()
+                    else:
+                        commodity = commodities.get(symbol.lower())
+                        if not commodity:
+                            commodity = Commodity(symbol, category, row['name'].strip())
+                            commodities[symbol.lower()] = commodity
+                        commodity.name = row['name'].strip()
+                        commodity.market_ord = int(row['market'].strip())
+                        commodity.carrier_ord = int(row['carrier'].strip())
+        return commodities
@@ -1,143 +1,401 @@
-import csv
-import json
-import re
 import os
+import queue
+import threading
+import time
+from collections import deque
 from os import path
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Sequence
 
 from EDMCLogging import get_main_logger
 from monitor import monitor
 from config import config
 from companion import CAPIData
 
-from . import construction
-from .construction import Construction, ConstructionResource
+from .construction import Construction, ConstructionRegistry, ConstructionResource
+from .needs import NeedsMatrix
 from .fleetcarrier import FleetCarrier
+from .persistence import PersistenceWorker
+from .storage import Storage, open_storage
+from .markets import MarketCache
+from .backfill import JournalBackfill, journal_epoch, journal_timestamp
+from .capi import CarrierFetch, Fetch
+from .pipeline import JournalPipeline, snapshot_state
+from .planner import HaulPlan, HaulPlanner
+from .telemetry import DeliveryTelemetry, Estimate
+from .metrics import metrics, timed
+from .catalog import CommodityCatalog
+from .names import commodity_names
 from .ui import MainUi
-from .config import Config
-from .data import Commodity, TableEntry, ptl
+from .config import settings
+from .data import Commodity, TableEntry, TableEntryPool, ptl
 
 logger = get_main_logger()
 
 class ColonizationPlugin:
+    FETCH_POLL_MS = 100
+    PIPELINE_POLL_MS = 50
 
     def __init__(self) -> None:
         self.commodityMap: dict[str, Commodity] = {}
-        self.constructions: list[Construction] = []
-        self.carrier: FleetCarrier = FleetCarrier()
+        self.catalog: CommodityCatalog | None = None
+        self.constructions: ConstructionRegistry = ConstructionRegistry()
+        self.lock = threading.RLock()
+        self.persistence = PersistenceWorker()
+        self.carrier: FleetCarrier = FleetCarrier(self.persistence)
         self.cargo: dict[str, int] = {}
         self.maxcargo: int = 0
         self.currentConstruction: Construction | None = None
+        # market_id of the selected tracked construction, -1 for totals, None when docked at an untracked one
         self.currentConstructionId: int | None = -1
         self.pluginDir: str | None = None
         self.saveDir: str | None = None
+        self.storage: Storage | None = None
+        self._snapshot_requested = False
+        # finished constructions, read from the archive file only when asked for
+        self._archive: dict[int | None, Construction] | None = None
         self.ui: MainUi | None = None
         self.dockedConstruction = False
-        self.markets: dict[str, list[str]] = {}
+        self.markets: MarketCache = MarketCache(self.persistence)
+        self._table_pool = TableEntryPool()
+        self.backfill: JournalBackfill = JournalBackfill()
+        self._backfilling = False
+        self._backfill_done: Callable[[int], None] | None = None
+        self._backfill_results: queue.Queue[int] = queue.Queue()
+        self._held: deque[tuple[dict[str, Any], dict[str, Any]]] = deque()
+        self.carrierFetch = CarrierFetch()
+        self._fetch_done: Callable[[Exception | None], None] | None = None
+        self._fetch_polling = False
+        self.pipeline = JournalPipeline(self._apply_journal)
+        self.planner = HaulPlanner()
+        self.telemetry = DeliveryTelemetry()
+        self._pipeline_polling = False
+        self._polled_version = 0
         self.currentMarketId = None
+        self.version: int = 0
+        self._update_pending = False
+        self._handlers: dict[str, Callable[[dict[str, Any], dict[str, Any]], None]] = {
+            'MarketBuy': self._on_market_buy,
+            'MarketSell': self._on_market_sell,
+            'CargoTransfer': self._on_cargo_transfer,
+            'Loadout': self._on_loadout,
+            'ColonisationContribution': self._on_colonisation_contribution,
+            'ColonisationConstructionDepot': self._on_colonisation_construction_depot,
+            'Cargo': self._on_cargo,
+            'StartUp': self._on_startup,
+            'Docked': self._on_docked,
+            'Undocked': self._on_undocked,
+        }
+        self._startup_steps: list[Callable[[], None]] = []
+        self.startupTimes: dict[str, float] = {}
         logger.debug("initialized")
 
     def plugin_start3(self, plugin_dir: str) -> None:
+        start = time.perf_counter()
         self.pluginDir = plugin_dir
         self.saveDir = path.abspath(path.join(plugin_dir, "../../colonization"))
         if not path.exists(self.saveDir):
             os.makedirs(self.saveDir)
-        self._load_commodity_map()
-        self._load_commodity_sorting()
-        self.load()
+        self.catalog = CommodityCatalog(plugin_dir, str(config.app_dir_path), self.saveDir)
+        settings.refresh()
+        self.storage = open_storage(self.saveDir, settings.storage, settings.delta_log)
+        metrics.enabled = settings.perf_metrics
+        self._startup_steps = [self._load_commodity_catalog, self.load]
+        if not settings.lazy_startup:
+            self.ensure_loaded()
+        self.persistence.start()
+        if settings.journal_pipeline:
+            self.pipeline.start()
+        self.startupTimes['plugin_start3'] = time.perf_counter() - start
+
+    def ensure_loaded(self) -> None:
+        while self._startup_steps:
+            self._run_startup_step()
+
+    def schedule_startup(self) -> None:
+        if self._startup_steps and self.ui and self.ui.frame:
+            self.ui.frame.after_idle(self._startup_idle)
+        else:
+            self.update_display()
 
+    def _startup_idle(self) -> None:
+        if not self._startup_steps:
+            return
+        self._run_startup_step()
+        if self._startup_steps and self.ui and self.ui.frame:
+            self.ui.frame.after_idle(self._startup_idle)
+        else:
+            self.mark_dirty()
+
+    def _run_startup_step(self) -> None:
+        step = self._startup_steps.pop(0)
+        start = time.perf_counter()
+        with self.lock:
+            step()
+        self.startupTimes[step.__name__.strip('_')] = time.perf_counter() - start
+        if not self._startup_steps:
+            logger.info("Startup timing: %s", ", ".join(
+                f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.startupTimes.items()))
+
+    def plugin_stop(self) -> None:
+        self.pipeline.stop()
+        while self._held:
+            self._apply_journal(*self._held.popleft())
+        self.persistence.stop()
+        if self.storage:
+            self.storage.close()
+        self.backfill.save()
+
+    @timed("cmdr_data")
     def cmdr_data(self, data: CAPIData, is_beta: bool) -> None:
-        local_commodities: list[str] = []
-        for commodity in data['lastStarport'].get('commodities') or []:
-            if commodity['stock'] > 0:
-                local_commodities.append(commodity['name'].lower())
-        self.markets[data['lastStarport'].get('id')] = local_commodities
-        self.update_display()
+        self.ensure_loaded()
+        local_commodities = [commodity_names.symbol(commodity['name'])
+                             for commodity in data['lastStarport'].get('commodities') or []
+                             if commodity['stock'] > 0]
+        self.markets.put(data['lastStarport'].get('id'), local_commodities)
+        self.mark_dirty()
 
     def journal_entry(self, cmdr: str, is_beta: bool, system: str, station: str, entry: dict[str, Any],
                       state: dict[str, Any]) -> str:
+        if entry['event'] not in self._handlers:
+            return ''
+        self.ensure_loaded()
+        if self.pipeline.running:
+            # once the queue has overflowed, later events wait behind the held ones to keep their order
+            if self._held or not self.pipeline.submit(entry, state):
+                if not self._held:
+                    logger.warning("Journal queue is full, holding events until it drains")
+                self._held.append((dict(entry), snapshot_state(state)))
+            if not self._pipeline_polling and self.ui and self.ui.frame:
+                self._pipeline_polling = True
+                self.ui.frame.after(self.PIPELINE_POLL_MS, self._poll_pipeline)
+        elif self._backfilling:
+            # the replay has the plugin state swapped out, live events wait until it is restored
+            self._held.append((dict(entry), snapshot_state(state)))
+        else:
+            self._apply_journal(entry, state)
+        return ''
 
-        if entry['event'] == 'MarketBuy':
-            self.add_cargo(entry['Type'], entry['Count'])
-            if self.carrier.callSign and state['StationName'] == self.carrier.callSign:
-                self.carrier.remove(entry['Type'], entry['Count'])
-            self.update_display()
-
-        if entry['event'] == "MarketSell":
-            self.remove_cargo(entry['Type'], entry['Count'])
-            if self.carrier.callSign and state['StationName'] == self.carrier.callSign:
-                self.carrier.add(entry['Type'], entry['Count'])
+    def _apply_journal(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        handler = self._handlers[entry['event']]
+        if metrics.enabled:
+            start = time.perf_counter()
+            with self.lock:
+                handler(entry, state)
+            metrics.record("journal_entry." + entry['event'], time.perf_counter() - start)
+        else:
+            with self.lock:
+                handler(entry, state)
+        self.backfill.seen(entry.get('timestamp'))
+
+    def _poll_pipeline(self) -> None:
+        while self._held and self.pipeline.running and self.pipeline.submit(*self._held[0]):
+            self._held.popleft()
+        if self.version != self._polled_version:
+            self._polled_version = self.version
             self.update_display()
-
-        if entry['event'] == "CargoTransfer":
+        if self.pipeline.idle and self.version == self._polled_version and not self._held:
+            self._pipeline_polling = False
+        elif self.ui and self.ui.frame:
+            self.ui.frame.after(self.PIPELINE_POLL_MS, self._poll_pipeline)
+        else:
+            self._pipeline_polling = False
+
+    def backfill_journals(self, done: Callable[[int], None] | None = None) -> bool:
+        self.ensure_loaded()
+        if self._backfilling:
+            return False
+        self._backfilling = True
+        self._backfill_done = done
+        # queued behind pending journal events so live and replayed events never interleave
+        if self.pipeline.running:
+            self.pipeline.call(self._run_backfill)
+        else:
+            threading.Thread(target=self._run_backfill, name="colonization-backfill", daemon=True).start()
+        if self.ui and self.ui.frame:
+            self.ui.frame.after(self.FETCH_POLL_MS, self.poll_backfill)
+        return True
+
+    def poll_backfill(self) -> None:
+        try:
+            count = self._backfill_results.get_nowait()
+        except queue.Empty:
+            if self.ui and self.ui.frame:
+                self.ui.frame.after(self.FETCH_POLL_MS, self.poll_backfill)
+            return
+        # with the pipeline running the held events are fed to it by _poll_pipeline instead
+        while self._held and not self.pipeline.running:
+            self._apply_journal(*self._held.popleft())
+        self._backfilling = False
+        done, self._backfill_done = self._backfill_done, None
+        self.update_display()
+        if done:
+            done(count)
+
+    def _run_backfill(self) -> None:
+        count = 0
+        try:
+            count = self.replay_journals()
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Journal backfill failed")
+        self._backfill_results.put(count)
+
+    def replay_journals(self) -> int:
+        with self.lock:
+            saved = (self.cargo, self.maxcargo, self.currentConstruction, self.currentConstructionId,
+                     self.dockedConstruction, self.currentMarketId)
+            self.cargo = self.cargo.copy()
+        try:
+            count = self.backfill.run(self._apply_backfill)
+        finally:
+            with self.lock:
+                (self.cargo, self.maxcargo, self.currentConstruction, self.currentConstructionId,
+                 self.dockedConstruction, self.currentMarketId) = saved
+        self.backfill.save()
+        self.mark_dirty()
+        return count
+
+    def _apply_backfill(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        if entry['event'] in ('CargoTransfer', 'MarketBuy', 'MarketSell'):
+            if not self.carrier.lastSync or entry.get('timestamp', '')[:19] <= self.carrier.lastSync[:19]:
+                return
+        with self.lock:
+            self._handlers[entry['event']](entry, state)
+
+    def _on_market_buy(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        symbol = commodity_names.symbol(entry['Type'])
+        self.add_cargo(symbol, entry['Count'])
+        if self.carrier.callSign and state['StationName'] == self.carrier.callSign:
+            self.carrier.apply_many([(symbol, -entry['Count'])])
+        self.mark_dirty()
+
+    def _on_market_sell(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        symbol = commodity_names.symbol(entry['Type'])
+        self.remove_cargo(symbol, entry['Count'])
+        if self.carrier.callSign and state['StationName'] == self.carrier.callSign:
+            self.carrier.apply_many([(symbol, entry['Count'])])
+        self.mark_dirty()
+
+    def _on_cargo_transfer(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        with self.carrier.batch():
             for t in entry['Transfers']:
+                symbol = commodity_names.symbol(t['Type'])
                 if t['Direction'] == "toship":
-                    self.add_cargo(t['Type'], t['Count'])
-                    self.carrier.remove(t['Type'], t['Count'])
+                    self.add_cargo(symbol, t['Count'])
+                    self.carrier.remove(symbol, t['Count'])
                 if t['Direction'] == "tocarrier":
-                    self.remove_cargo(t['Type'], t['Count'])
-                    self.carrier.add(t['Type'], t['Count'])
-            self.update_display()
-
-        if entry['event'] == "Loadout" and entry["Ship"] and entry["CargoCapacity"]:
+                    self.remove_cargo(symbol, t['Count'])
+                    self.carrier.add(symbol, t['Count'])
+        if metrics.enabled:
+            logger.debug("Fleet carrier writes avoided so far: %d", self.carrier.avoided_writes)
+        self.mark_dirty()
+
+    def _on_loadout(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        if entry["Ship"] and entry["CargoCapacity"]:
             self.maxcargo = int(entry["CargoCapacity"])
+            self.mark_dirty()
 
-        if entry['event'] == "ColonisationContribution":
-            delivery = {}
-            for c in entry['Contributions']:
-                delivery[self.commodity_from_name(c['Name'])] = c['Amount']
-            self.colonisation_contribution(entry['MarketID'], delivery)
-            self.update_display()
-            self.save()
-
-        if entry['event'] == "ColonisationConstructionDepot":
-            if not state['StationName']:
-                return ''
-            required = {}
-            for r in entry['ResourcesRequired']:
-                required[self.commodity_from_name(r['Name'])] = ConstructionResource(
-                    commodity=self.commodity_from_name(r['Name']),
-                    required=r['RequiredAmount'],
-                    provided=r['ProvidedAmount'],
-                    payment=r['Payment'])
-            self.colonisation_construction_depot(
-                system_name=state['SystemName'],
-                station_name=state['StationName'],
-                market_id=entry['MarketID'],
-                construction_progress=entry['ConstructionProgress'],
-                construction_complete=entry['ConstructionComplete'],
-                construction_failed=entry['ConstructionFailed'],
-                required=required)
-            self.update_display()
-            self.save()
-
-        if entry['event'] == "Cargo":
-            self.cargo = state['Cargo'].copy()
-            self.maxcargo = max(int(entry.get("Count", 0)), self.maxcargo)
-            self.update_display()
-            self.save()
+    def _on_colonisation_contribution(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        delivery = {}
+        for c in entry['Contributions']:
+            delivery[self.commodity_from_name(c['Name'])] = c['Amount']
+        self.colonisation_contribution(entry['MarketID'], delivery, entry.get('timestamp'))
+        self.mark_dirty()
 
-        if entry['event'] == 'StartUp':
-            self.cargo = state['Cargo'].copy()
-            self.maxcargo = max(int(entry.get("Count", 0)), self.maxcargo)
-            self.set_docked(state)
+    def _on_colonisation_construction_depot(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        if not state['StationName']:
+            return
+        required = {}
+        for r in entry['ResourcesRequired']:
+            symbol = self.commodity_from_name(r['Name'])
+            required[symbol] = ConstructionResource(
+                commodity=symbol,
+                required=r['RequiredAmount'],
+                provided=r['ProvidedAmount'],
+                payment=r['Payment'])
+        self.colonisation_construction_depot(
+            system_name=state['SystemName'],
+            station_name=state['StationName'],
+            market_id=entry['MarketID'],
+            construction_progress=entry['ConstructionProgress'],
+            construction_complete=entry['ConstructionComplete'],
+            construction_failed=entry['ConstructionFailed'],
+            required=required,
+            timestamp=entry.get('timestamp'))
+
+    def _on_cargo(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        self.cargo = state['Cargo'].copy()
+        self.maxcargo = max(int(entry.get("Count", 0)), self.maxcargo)
+        self.mark_dirty()
+
+    def _on_startup(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        self.cargo = state['Cargo'].copy()
+        self.maxcargo = max(int(entry.get("Count", 0)), self.maxcargo)
+        self.set_docked(state)
+
+    def _on_docked(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        self.set_docked(state)
+
+    def _on_undocked(self, entry: dict[str, Any], state: dict[str, Any]) -> None:
+        self.dockedConstruction = False
+        self.currentMarketId = None
+        self.archive_finished()
+        self.mark_dirty()
 
-        if entry['event'] == 'Docked':
-            self.set_docked(state)
+    def mark_dirty(self) -> None:
+        self.version += 1
+        # the Tk thread picks up changes made by the journal worker in _poll_pipeline
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if self._update_pending or not self.ui or not self.ui.frame:
+            return
+        self._update_pending = True
+        self.ui.frame.after_idle(self._refresh_display)
 
-        if entry['event'] == "Undocked":
-            self.dockedConstruction = False
-            self.currentMarketId = None
-            self.update_display()
-        return ''
+    def _refresh_display(self) -> None:
+        self._update_pending = False
+        self.update_display()
 
+    @timed("capi_fleetcarrier")
     def capi_fleetcarrier(self, data: CAPIData) -> str:
-        self.carrier.sync_data(data)
-        self.update_display()
+        self.ensure_loaded()
+        call_sign = self.carrier.callSign
+        if self.carrier.sync_data(data) is None or self.carrier.delta or self.carrier.callSign != call_sign:
+            self.mark_dirty()
         return ''
 
+    def fetch_carrier(self, url: str, fetch: Fetch,
+                      done: Callable[[Exception | None], None] | None = None) -> bool:
+        self._fetch_done = done
+        started = self.carrierFetch.request(url, fetch)
+        if self.ui and self.ui.frame and not self._fetch_polling:
+            self._fetch_polling = True
+            self.ui.frame.after(self.FETCH_POLL_MS, self.poll_carrier_fetch)
+        return started
+
+    def poll_carrier_fetch(self) -> None:
+        busy = self.carrierFetch.busy
+        results = self.carrierFetch.drain()
+        for data, error in results:
+            if error is None:
+                self.capi_fleetcarrier(data)
+        if not results and busy and self.ui and self.ui.frame:
+            self.ui.frame.after(self.FETCH_POLL_MS, self.poll_carrier_fetch)
+            return
+        self._fetch_polling = False
+        if results:
+            done, self._fetch_done = self._fetch_done, None
+            if done:
+                done(results[-1][1])
+
     def update_display(self, event: Any = None) -> None:
-        if self.ui:
+        with self.lock:
+            self._update_display()
+
+    @timed("update_display")
+    def _update_display(self) -> None:
+        # the plugin state is swapped out while journals are replayed
+        if self.ui and not self._backfilling:
+            self.ensure_loaded()
             is_total = False
             if self.currentConstruction:
                 short_name = self.currentConstruction.get_short_name()
@@ -158,21 +416,29 @@ class ColonizationPlugin:
                     self.ui.set_title(ptl("Total"))
                     self.ui.set_station("")
 
-            self.ui.set_total(self.get_total_shopping_value(), self.maxcargo)
+            trips = len(self.get_haul_plan()) if settings.show_totals and self.maxcargo > 0 else None
+            self.ui.set_total(self.get_total_shopping_value(), self.maxcargo, trips=trips)
+            if settings.show_totals:
+                estimate = self.get_estimate()
+                self.ui.set_rate(estimate.rate, estimate.eta,
+                                 [self.commodityMap[c].name if c in self.commodityMap else c
+                                  for c in estimate.bottlenecks])
+            else:
+                self.ui.set_rate(0.0, None, [])
             docked_to: Optional[str] = None
             if self.dockedConstruction:
                 docked_to = "construction"
             if self.carrier.callSign and monitor.state['StationName'] == self.carrier.callSign:
                 docked_to = "carrier"
-            self.ui.set_table(self.get_table(), docked_to, is_total)
+            self.ui.set_table(self.get_table, docked_to, is_total, self.version)
             if self.ui.track_btn and self.ui.total_label:
                 if self.dockedConstruction and self.currentConstructionId is None:
                     self.ui.track_btn.grid()
-                    if Config.SHOW_TOTALS.get():
+                    if settings.show_totals:
                         self.ui.total_label.grid_remove()
                 else:
                     self.ui.track_btn.grid_remove()
-                    if Config.SHOW_TOTALS.get():
+                    if settings.show_totals:
                         self.ui.total_label.grid()
             if self.ui.prev_btn and self.ui.next_btn:
                 if self.dockedConstruction or len(self.constructions) == 0:
@@ -183,87 +449,149 @@ class ColonizationPlugin:
                     self.ui.next_btn.grid()
 
     def get_table(self) -> list[TableEntry]:
-        needed = self.currentConstruction.required if self.currentConstruction else self.get_total_shopping_list()
+        matrix, columns, needed = self._needs()
+        cargo = matrix.vector(self.cargo)
+        carrier = matrix.vector(self.carrier.cargo)
+        buy = matrix.buy(columns, needed, cargo, carrier)
+        symbols = matrix.symbols
         table: list[TableEntry] = []
-        local_commodities: list[str] = self.markets.get(self.currentMarketId, []) if self.currentMarketId else []
-        for commodity, required in needed.items():
-            table.append(TableEntry(
+        local_commodities = self.markets.get(self.currentMarketId)
+        # entries are reused between rebuilds; the ui only keeps the latest table
+        for i, col in enumerate(columns):
+            commodity = symbols[col]
+            table.append(self._table_pool.get(
+                i,
                 commodity=self.commodityMap[commodity],
-                demand=required.needed() if isinstance(required, ConstructionResource) else required,
-                cargo=self.cargo.get(commodity, 0),
-                carrier=self.carrier.get(commodity),
-                available=commodity in local_commodities
+                demand=needed[col],
+                cargo=cargo[col],
+                carrier=carrier[col],
+                available=commodity in local_commodities,
+                buy=buy[i]
             ))
         return table
 
+    def _needs(self) -> tuple[NeedsMatrix, list[int], Sequence[int]]:
+        matrix = self.constructions.matrix
+        construction = self.currentConstruction
+        if construction is None:
+            return matrix, sorted(matrix.columns(), key=matrix.symbols.__getitem__), matrix.needed()
+        if construction in self.constructions:
+            return matrix, matrix.columns(construction.market_id), matrix.needed(construction.market_id)
+        # an untracked site gets its own columns, the shared matrix is only changed by tracked ones
+        local = NeedsMatrix(construction.required)
+        return (local, list(range(len(local.symbols))),
+                local.vector({k: r.needed() for k, r in construction.required.items()}))
+
     def get_total_shopping_value(self) -> int:
-        needed = self.currentConstruction.required if self.currentConstruction else self.get_total_shopping_list()
-        value = 0
-        for required in needed.values():
-            value += required.needed() if isinstance(required, ConstructionResource) else required
-        return value
-
-    def _load_commodity_map(self) -> None:
-        for f in ('commodity.csv', 'rare_commodity.csv'):
-            if not (config.app_dir_path / 'FDevIDs' / f).is_file():
-                continue
-            with open(config.app_dir_path / 'FDevIDs' / f, 'r') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    symbol = row['symbol']
-                    self.commodityMap[symbol.lower()] = Commodity(symbol, row['category'], row['name'])
-
-    def _load_commodity_sorting(self) -> None:
-        language = config.get_str('language', default='en')
-        filePath = path.join(self.pluginDir, 'L10n', f"sorting-{language}.csv")
-        if not path.isfile(filePath):
-            filePath = path.join(self.pluginDir, 'L10n', "sorting-en.csv")
-        if path.isfile(filePath):
-            with open(filePath, mode='r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                category = ''
-                for row in reader:
-                    symbol = row['symbol'].strip()
-                    if symbol == '*':
-                        category = row['name'].strip()
-                    else:
-                        commodity = self.commodityMap.get(symbol.lower())
-                        if not commodity:
-                            commodity = Commodity(symbol, category, row['name'].strip())
-                            self.commodityMap[symbol.lower()] = commodity
-                        commodity.name = row['name'].strip()
-                        commodity.market_ord = int(row['market'].strip())
-                        commodity.carrier_ord = int(row['carrier'].strip())
+        construction = self.currentConstruction
+        if construction is not None and construction not in self.constructions:
+            return sum(r.needed() for r in construction.required.values())
+        return self.constructions.matrix.total_needed(construction.market_id if construction else None)
+
+    def get_haul_plan(self) -> HaulPlan:
+        if self.currentConstruction:
+            needs = {k: r.needed() for k, r in self.currentConstruction.required.items()}
+        else:
+            needs = self.get_total_shopping_list()
+        return self.planner.plan(needs, self.carrier.cargo, self.cargo, self.maxcargo)
+
+    def get_estimate(self) -> Estimate:
+        construction = self.currentConstruction
+        if construction is None:
+            return self.telemetry.estimate(self.get_total_shopping_list())
+        needs = {k: r.needed() for k, r in construction.required.items()}
+        return self.telemetry.estimate(needs, construction.market_id)
+
+    def _load_commodity_catalog(self) -> None:
+        if self.catalog is None:
+            return
+        self.commodityMap = self.catalog.load(config.get_str('language', default='en'))
 
     def update_language(self):
-        self._load_commodity_sorting()
+        self._load_commodity_catalog()
+        self.version += 1
         self.ui.reset_frame()
 
     def load(self) -> None:
-        self.constructions = []
-        if self.saveDir is None:
+        self.constructions = ConstructionRegistry()
+        if self.storage is None:
             return
-        file_path = path.join(self.saveDir, "constructions.json")
-        if path.isfile(file_path):
-            for c in json.load(open(file_path, 'r', encoding='utf-8')):
-                self.constructions.append(Construction(**c))
-        self.carrier.load(path.join(self.saveDir, 'fccargo.json'))
+        self.constructions = self.storage.load()
+        self._archive = None
+        self.archive_finished()
+        self.telemetry.clear()
+        since = journal_timestamp(time.time() - self.telemetry.window)
+        for market_id, commodity, quantity, _, timestamp in self.storage.deliveries(since=since):
+            if self.constructions.get(market_id):
+                self.telemetry.record(market_id, commodity, quantity, journal_epoch(timestamp))
+        if self.storage.compact:
+            self.save()
+        self.carrier.load(self.storage)
+        self.markets.load(path.join(self.storage.saveDir, 'markets.json'))
+        journal_dir = monitor.currentdir or config.get_str('journaldir') or config.default_journal_dir
+        self.backfill.load(journal_dir, path.join(self.storage.saveDir, 'backfill.json'), self.storage.baseline)
 
+    @timed("save")
     def save(self) -> None:
-        if self.saveDir is None:
+        if self.storage is None:
             return
-        with open(path.join(self.saveDir, "constructions.json"), 'w', encoding='utf-8') as file:
-            json.dump(self.constructions, file, ensure_ascii=False, indent=4, cls=construction.ConstructionEncoder)
+        self._snapshot_requested = True
+        self.persistence.mark_dirty(self.storage.key, self._write_constructions)
+
+    def _record(self, record: dict[str, Any]) -> None:
+        if self.storage is None:
+            return
+        if not self.storage.incremental:
+            self.save()
+            return
+        self.storage.record(record)
+        self.persistence.mark_dirty(self.storage.key, self._write_constructions)
+
+    def get_archive(self) -> list[Construction]:
+        with self.lock:
+            if self._archive is None:
+                archived = self.storage.load_archive() if self.storage else []
+                self._archive = {c.market_id: c for c in archived}
+            return list(self._archive.values())
+
+    def archive_finished(self) -> None:
+        with self.lock:
+            finished = [c for c in self.constructions if (c.construction_complete or c.construction_failed)
+                        and not (self.dockedConstruction and c is self.currentConstruction)]
+            if not finished or self.storage is None:
+                return
+            # written before the removals are recorded, a crash in between leaves the site in both files
+            try:
+                self.storage.archive([c.to_dict() for c in finished])
+            except OSError:
+                logger.exception("Cannot write construction archive")
+                return
+            for c in finished:
+                self.constructions.remove(c)
+                self.telemetry.remove(c.market_id)
+                self._record({'op': 'remove', 'market_id': c.market_id})
+                if self._archive is not None:
+                    self._archive[c.market_id] = c
+                if c is self.currentConstruction:
+                    self.currentConstructionId = -1
+                    self.currentConstruction = None
+            logger.info("Archived %d finished constructions", len(finished))
+        self.mark_dirty()
+
+    @timed("save.write")
+    def _write_constructions(self) -> None:
+        if self.storage is None:
+            return
+        with self.lock:
+            batch = self.storage.take(self.constructions, self._snapshot_requested)
+            self._snapshot_requested = False
+        self.storage.write(batch)
 
     def get_total_shopping_list(self) -> dict[str, int]:
-        ret: dict[str, int] = {}
-        for i in self.constructions:
-            for commodity, req in i.required.items():
-                if commodity in ret:
-                    ret[commodity] += req.needed()
-                else:
-                    ret[commodity] = req.needed()
-        return dict(sorted(ret.items()))
+        if settings.verify_totals and not self.constructions.verify_totals():
+            logger.warning("Aggregated shopping list is out of sync, recomputing")
+            self.constructions = ConstructionRegistry(self.constructions)
+        return self.constructions.totals()
 
     def add_cargo(self, commodity: str, qty: int) -> int:
         if commodity in self.cargo:
@@ -285,91 +613,106 @@ class ColonizationPlugin:
         ui.on('next', self.next_construction)
         ui.on('track', self.track_station)
         ui.on('update', self.update_display)
-        self.update_display()
 
     def prev_construction(self, event: Any) -> None:
         if self.currentConstructionId is None:
             return
-        if self.currentConstructionId < 0:
-            self.currentConstructionId = len(self.constructions) - 1
-            if self.currentConstructionId >= 0:
-                self.currentConstruction = self.constructions[self.currentConstructionId]
-        elif self.currentConstructionId == 0:
-            self.currentConstructionId = -1
-            self.currentConstruction = None
+        if self.currentConstructionId == -1:
+            self._select_construction(self.constructions.last())
         else:
-            self.currentConstructionId -= 1
-            self.currentConstruction = self.constructions[self.currentConstructionId]
-        self.update_display()
+            self._select_construction(self.constructions.prev_of(self.currentConstructionId))
 
     def next_construction(self, event: Any) -> None:
         if self.currentConstructionId is None:
             return
-        self.currentConstructionId += 1
-        if self.currentConstructionId >= len(self.constructions):
+        if self.currentConstructionId == -1:
+            self._select_construction(self.constructions.first())
+        else:
+            self._select_construction(self.constructions.next_of(self.currentConstructionId))
+
+    def _select_construction(self, found: Construction | None) -> None:
+        if found:
+            self.currentConstructionId = found.market_id
+            self.currentConstruction = found
+        else:
             self.currentConstructionId = -1
             self.currentConstruction = None
-        else:
-            self.currentConstruction = self.constructions[self.currentConstructionId]
-        self.update_display()
+        self.mark_dirty()
 
     def set_docked(self, state: dict[str, Any]) -> None:
         self.currentMarketId = state['MarketID']
-        found = next((c for c in self.constructions if c.market_id == state['MarketID']), None)
+        found = self.constructions.get(state['MarketID'])
         if found:
-            self.currentConstructionId = self.constructions.index(found)
+            self.currentConstructionId = found.market_id
             self.currentConstruction = found
-        self.update_display()
+        self.mark_dirty()
 
     def colonisation_construction_depot(self, system_name: str, station_name: str, market_id: int,
                                         construction_progress: float,
                                         construction_complete: bool, construction_failed: bool,
-                                        required: dict[str, ConstructionResource]) -> None:
-        found = next((c for c in self.constructions if c.market_id == market_id), None)
+                                        required: dict[str, ConstructionResource],
+                                        timestamp: str | None = None) -> None:
+        found = self.constructions.get(market_id)
         self.dockedConstruction = True
         if found:
-            self.currentConstructionId = self.constructions.index(found)
+            # deliveries made by others only show up as progress between depot updates
+            self.telemetry.observe(market_id, {
+                commodity: resource.provided - found.required[commodity].provided
+                for commodity, resource in required.items() if commodity in found.required
+            }, journal_epoch(timestamp) if timestamp else None)
+            self.currentConstructionId = found.market_id
             self.currentConstruction = found
             found.station_name = station_name
             found.construction_progress = construction_progress
             found.construction_complete = construction_complete
             found.construction_failed = construction_failed
-            found.required = required
-            self.save()
+            self.constructions.set_required(found, required)
+            self._record({'op': 'depot', 'construction': found})
         else:
             self.currentConstructionId = None
             self.currentConstruction = Construction(system=system_name, station_name=station_name, market_id=market_id,
                                                     construction_progress=construction_progress,
                                                     construction_complete=construction_complete,
                                                     construction_failed=construction_failed, required=required)
-        self.update_display()
+        self.mark_dirty()
 
-    def colonisation_contribution(self, market_id: int, delivery: dict[str, int]) -> None:
-        found = next((c for c in self.constructions if c.market_id == market_id), None)
+    def colonisation_contribution(self, market_id: int, delivery: dict[str, int],
+                                  timestamp: str | None = None) -> None:
+        found = self.constructions.get(market_id)
         if not found and self.currentConstruction and self.currentConstruction.market_id == market_id:
             found = self.currentConstruction
         if found:
+            tracked = found in self.constructions
+            when = journal_epoch(timestamp) if timestamp else None
             for commodity, qty in delivery.items():
-                found.deliver(commodity, qty)
+                if tracked:
+                    self.constructions.deliver(found, commodity, qty)
+                    self.telemetry.record(market_id, commodity, qty, when)
+                else:
+                    found.deliver(commodity, qty)
+                if tracked and commodity in found.required:
+                    self._record({'op': 'deliver', 'market_id': market_id, 'commodity': commodity,
+                                  'provided': found.required[commodity].provided, 'quantity': qty,
+                                  'time': timestamp or journal_timestamp(time.time())})
 
     def track_station(self, event: Any) -> None:
-        if self.dockedConstruction and self.currentConstructionId is None and self.currentConstruction:
-            self.constructions.append(self.currentConstruction)
-            self.currentConstructionId = len(self.constructions) - 1
-        self.update_display()
-        self.save()
+        with self.lock:
+            if self.dockedConstruction and self.currentConstructionId is None and self.currentConstruction:
+                self.constructions.add(self.currentConstruction)
+                self.currentConstructionId = self.currentConstruction.market_id
+                self._record({'op': 'track', 'construction': self.currentConstruction})
+        self.mark_dirty()
 
     def remove_construction(self, to_remove: Construction) -> None:
-        self.constructions.remove(to_remove)
-        if self.currentConstruction == to_remove:
-            self.currentConstructionId = -1
-            self.currentConstruction = None
-        self.update_display()
-        self.save()
+        with self.lock:
+            self.constructions.remove(to_remove)
+            self.telemetry.remove(to_remove.market_id)
+            if self.currentConstruction == to_remove:
+                self.currentConstructionId = -1
+                self.currentConstruction = None
+            self._record({'op': 'remove', 'market_id': to_remove.market_id})
+        self.mark_dirty()
 
     @classmethod
     def commodity_from_name(cls, name: str) -> str:
-        m = re.search('^\\$(.*)_', name)
-        if not m:
-            return name
-        return m.group(1).lower()
+        return commodity_names.symbol(name)
@@ -14,6 +14,12 @@ class Config(Enum):
     CATEGORIES = f"{PREFIX}Categories", bool, True
     COLLAPSABLE = f"{PREFIX}Collapsable", bool, True
     ROWS = f"{PREFIX}Rows", int, 25
+    DELTA_LOG = f"{PREFIX}deltaLog", bool, True
+    PERF_METRICS = f"{PREFIX}perfMetrics", bool, False
+    LAZY_STARTUP = f"{PREFIX}lazyStartup", bool, True
+    JOURNAL_PIPELINE = f"{PREFIX}journalPipeline", bool, True
+    STORAGE = f"{PREFIX}storage", str, "json"
+    VERIFY_TOTALS = f"{PREFIX}verifyTotals", bool, False
 
     def __init__(self, key:str, var_type:type, default:Any=None):
         self.key = key
@@ -62,3 +68,72 @@ class Config(Enum):
 
     def tk_string_var(self) -> tk.StringVar:
         return tk.StringVar(value=str(self.get()))
+
+
+class Settings:
+    def __init__(self) -> None:
+        self._values: dict[Config, Any] = {}
+
+    def refresh(self, *keys: Config) -> None:
+        for key in keys or tuple(Config):
+            self._values[key] = key.get()
+
+    def __getitem__(self, key: Config) -> Any:
+        if key not in self._values:
+            self._values[key] = key.get()
+        return self._values[key]
+
+    def __setitem__(self, key: Config, value: Any) -> None:
+        key.set(value)
+        self._values[key] = value
+
+    @property
+    def ignore_fc_update(self) -> bool:
+        return bool(self[Config.IGNORE_FC_UPDATE])
+
+    @property
+    def show_station_name(self) -> bool:
+        return bool(self[Config.SHOW_STATION_NAME])
+
+    @property
+    def show_totals(self) -> bool:
+        return bool(self[Config.SHOW_TOTALS])
+
+    @property
+    def categories(self) -> bool:
+        return bool(self[Config.CATEGORIES])
+
+    @property
+    def collapsable(self) -> bool:
+        return bool(self[Config.COLLAPSABLE])
+
+    @property
+    def rows(self) -> int:
+        return int(self[Config.ROWS])
+
+    @property
+    def delta_log(self) -> bool:
+        return bool(self[Config.DELTA_LOG])
+
+    @property
+    def perf_metrics(self) -> bool:
+        return bool(self[Config.PERF_METRICS])
+
+    @property
+    def lazy_startup(self) -> bool:
+        return bool(self[Config.LAZY_STARTUP])
+
+    @property
+    def storage(self) -> str:
+        return str(self[Config.STORAGE])
+
+    @property
+    def verify_totals(self) -> bool:
+        return bool(self[Config.VERIFY_TOTALS])
+
+    @property
+    def journal_pipeline(self) -> bool:
+        return bool(self[Config.JOURNAL_PIPELINE])
+
+
+settings = Settings()
@@ -1,7 +1,8 @@
 import json
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 from .data import ptl
+from .needs import NeedsMatrix
 
 from EDMCLogging import get_main_logger
 
@@ -9,6 +10,8 @@ logger = get_main_logger()
 
 
 class ConstructionResource:
+    __slots__ = ('commodity', 'required', 'provided', 'payment')
+
     def __init__(self, commodity: str, required: int, provided: int, payment: int) -> None:
         self.commodity: str = commodity
         self.required: int = required
@@ -18,15 +21,26 @@ class ConstructionResource:
     def needed(self) -> int:
         return self.required - self.provided
 
+    def to_dict(self) -> dict[str, Any]:
+        return {'commodity': self.commodity, 'required': self.required, 'provided': self.provided,
+                'payment': self.payment}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'ConstructionResource':
+        return cls(commodity=data['commodity'], required=data['required'], provided=data['provided'],
+                   payment=data.get('payment', 0))
+
 
 class Construction:
+    __slots__ = ('required', 'construction_progress', 'construction_complete', 'construction_failed',
+                 'system', 'station_name', 'market_id')
 
     def __init__(self, system: Optional[str] = None, station_name: Optional[str] = None,
                  market_id: Optional[int] = None, construction_progress: float = 0.0,
                  construction_complete: float = False, construction_failed: float = False,
                  required: Optional[dict[str, ConstructionResource] | dict[str, dict[str, Any]]] = None) -> None:
         self.required: dict[str, ConstructionResource] = {
-            k: ConstructionResource(**v) if isinstance(v, dict) else v for k, v in required.items()
+            k: ConstructionResource.from_dict(v) if isinstance(v, dict) else v for k, v in required.items()
         } if required else {}
         self.construction_progress = construction_progress
         self.construction_complete = construction_complete
@@ -41,6 +55,26 @@ class Construction:
         if commodity in self.required:
             self.required[commodity].provided += quantity
 
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'required': {k: v.to_dict() for k, v in self.required.items()},
+            'construction_progress': self.construction_progress,
+            'construction_complete': self.construction_complete,
+            'construction_failed': self.construction_failed,
+            'system': self.system,
+            'station_name': self.station_name,
+            'market_id': self.market_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'Construction':
+        return cls(system=data.get('system'), station_name=data.get('station_name'),
+                   market_id=data.get('market_id'),
+                   construction_progress=data.get('construction_progress', 0.0),
+                   construction_complete=data.get('construction_complete', False),
+                   construction_failed=data.get('construction_failed', False),
+                   required=data.get('required'))
+
     def set_station(self, system: str, station_name: str, market_id: int) -> None:
         self.system = system
         self.station_name = station_name
@@ -68,10 +102,108 @@ class Construction:
         return self.station_name + suffix
 
 
+class ConstructionRegistry:
+
+    def __init__(self, constructions: Iterable[Construction] = ()) -> None:
+        self._items: dict[Optional[int], Construction] = {}
+        self._prev: dict[Optional[int], Optional[int]] = {}
+        self._next: dict[Optional[int], Optional[int]] = {}
+        self._last: Optional[int] = None
+        self.matrix = NeedsMatrix()
+        for c in constructions:
+            self.add(c)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Construction]:
+        return iter(list(self._items.values()))
+
+    def __contains__(self, construction: object) -> bool:
+        if not isinstance(construction, Construction):
+            return False
+        return self._items.get(construction.market_id) is construction
+
+    def get(self, market_id: Optional[int]) -> Optional[Construction]:
+        return self._items.get(market_id)
+
+    def add(self, construction: Construction) -> None:
+        key = construction.market_id
+        if key not in self._items:
+            self._prev[key] = self._last
+            self._next[key] = None
+            if self._last in self._next:
+                self._next[self._last] = key
+            self._last = key
+        self._items[key] = construction
+        self.matrix.set_row(key, construction.required)
+
+    def remove(self, construction: Construction | Optional[int]) -> Optional[Construction]:
+        key = construction.market_id if isinstance(construction, Construction) else construction
+        removed = self._items.pop(key, None)
+        if removed is None:
+            return None
+        self.matrix.remove_row(key)
+        prev_key = self._prev.pop(key)
+        next_key = self._next.pop(key)
+        if prev_key in self._next:
+            self._next[prev_key] = next_key
+        if next_key in self._prev:
+            self._prev[next_key] = prev_key
+        if self._last == key:
+            self._last = prev_key
+        return removed
+
+    def deliver(self, construction: Construction, commodity: str, quantity: int) -> None:
+        construction.deliver(commodity, quantity)
+        if construction in self and commodity in construction.required:
+            self.matrix.set_provided(construction.market_id, commodity, construction.required[commodity].provided)
+
+    def set_provided(self, construction: Construction, commodity: str, provided: int) -> None:
+        resource = construction.required.get(commodity)
+        if not resource:
+            return
+        resource.provided = provided
+        if construction in self:
+            self.matrix.set_provided(construction.market_id, commodity, provided)
+
+    def set_required(self, construction: Construction, required: dict[str, ConstructionResource]) -> None:
+        construction.required = required
+        if construction in self:
+            self.matrix.set_row(construction.market_id, required)
+
+    def totals(self) -> dict[str, int]:
+        return self.matrix.totals()
+
+    def recompute_totals(self) -> dict[str, int]:
+        ret: dict[str, int] = {}
+        for c in self._items.values():
+            for commodity, req in c.required.items():
+                ret[commodity] = ret.get(commodity, 0) + req.needed()
+        return dict(sorted(ret.items()))
+
+    def verify_totals(self) -> bool:
+        return self.totals() == self.recompute_totals()
+
+    def first(self) -> Optional[Construction]:
+        return next(iter(self._items.values()), None)
+
+    def last(self) -> Optional[Construction]:
+        return self._items.get(self._last) if self._items else None
+
+    def next_of(self, market_id: Optional[int]) -> Optional[Construction]:
+        key = self._next.get(market_id)
+        return self._items.get(key) if key in self._items else None
+
+    def prev_of(self, market_id: Optional[int]) -> Optional[Construction]:
+        key = self._prev.get(market_id)
+        return self._items.get(key) if key in self._items else None
+
+
 class ConstructionEncoder(json.JSONEncoder):
     def default(self, o: Any) -> Any:
-        if isinstance(o, Construction):
-            return o.__dict__
-        if isinstance(o, ConstructionResource):
-            return o.__dict__
+        if isinstance(o, ConstructionRegistry):
+            return list(o)
+        if isinstance(o, (Construction, ConstructionResource)):
+            return o.to_dict()
         return super().default(o)
@@ -1,4 +1,6 @@
-﻿from l10n import translations
+﻿from typing import Any
+
+from l10n import translations
 
 _ENGLISH_TRANSLATIONS = {
     "SortingMode.MARKET": "Market",
@@ -13,6 +15,8 @@ def ptl(x: str) -> str:
 
 
 class Commodity:
+    __slots__ = ('symbol', 'category', 'name', 'market_ord', 'carrier_ord')
+
     def __init__(self, symbol:str, category:str, name:str):
         self.symbol = symbol.strip() if symbol else ''
         self.category = category
@@ -20,14 +24,38 @@ class Commodity:
         self.market_ord: int = 0
         self.carrier_ord: int = 0
 
+    def to_dict(self) -> dict[str, Any]:
+        return {'symbol': self.symbol, 'category': self.category, 'name': self.name,
+                'market_ord': self.market_ord, 'carrier_ord': self.carrier_ord}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'Commodity':
+        commodity = cls(data['symbol'], data['category'], data['name'])
+        commodity.market_ord = data.get('market_ord', 0)
+        commodity.carrier_ord = data.get('carrier_ord', 0)
+        return commodity
+
 
 class TableEntry:
-    def __init__(self, commodity:Commodity, demand:int, cargo:int, carrier:int, available:bool):
+    __slots__ = ('commodity', 'demand', 'cargo', 'carrier', 'available', '_buy')
+
+    def __init__(self, commodity:Commodity, demand:int, cargo:int, carrier:int, available:bool,
+                 buy:int | None = None):
+        self.set(commodity, demand, cargo, carrier, available, buy)
+
+    def set(self, commodity:Commodity, demand:int, cargo:int, carrier:int, available:bool,
+            buy:int | None = None) -> 'TableEntry':
         self.commodity = commodity
         self.demand = demand
         self.cargo = cargo
         self.carrier = carrier
         self.available = available
+        if buy is None:
+            buy = demand - cargo - carrier
+            if buy < 0:
+                buy = 0
+        self._buy = buy
+        return self
 
     def category(self):
         return self.commodity.category
@@ -39,7 +67,20 @@ class TableEntry:
         return result
 
     def buy(self) -> int:
-        result = self.demand - self.cargo - self.carrier
-        if result < 0:
-            result = 0
-        return result
+        return self._buy
+
+
+class TableEntryPool:
+    def __init__(self) -> None:
+        self._entries: list[TableEntry] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, index: int, commodity:Commodity, demand:int, cargo:int, carrier:int, available:bool,
+            buy:int | None = None) -> TableEntry:
+        if index < len(self._entries):
+            return self._entries[index].set(commodity, demand, cargo, carrier, available, buy)
+        entry = TableEntry(commodity, demand, cargo, carrier, available, buy)
+        self._entries.append(entry)
+        return entry
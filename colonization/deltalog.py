@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+from os import path
+from typing import Any
+
+from EDMCLogging import get_main_logger
+
+from .construction import ConstructionEncoder
+
+logger = get_main_logger()
+
+
+class DeltaLog:
+    MAX_SIZE = 256 * 1024
+
+    def __init__(self, file_path: str) -> None:
+        self.filePath = file_path
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), cls=ConstructionEncoder)
+        with self._lock:
+            self._pending.append(line)
+
+    def take_pending(self) -> list[str]:
+        with self._lock:
+            lines = self._pending
+            self._pending = []
+        return lines
+
+    def write(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        with open(self.filePath, 'a', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def size(self) -> int:
+        return path.getsize(self.filePath) if path.isfile(self.filePath) else 0
+
+    def needs_compaction(self, pending: list[str]) -> bool:
+        return self.size() + sum(len(line) + 1 for line in pending) > self.MAX_SIZE
+
+    def reset(self) -> None:
+        if self.size() > 0:
+            with open(self.filePath, 'w', encoding='utf-8'):
+                pass
+
+    def read(self) -> list[dict[str, Any]]:
+        if not path.isfile(self.filePath):
+            return []
+        records: list[dict[str, Any]] = []
+        offset = 0
+        with open(self.filePath, 'rb') as file:
+            for raw in file:
+                if not raw.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(raw))
+                except ValueError:
+                    break
+                offset += len(raw)
+        if offset < self.size():
+            logger.warning("Truncating torn delta log %s at offset %d", self.filePath, offset)
+            with open(self.filePath, 'r+b') as file:
+                file.truncate(offset)
+        return records
@@ -1,70 +1,166 @@
 import datetime
 import json
-from typing import Any, Self
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Self
 from os import path
 from companion import CAPIData
 
+from .persistence import PersistenceWorker, atomic_write
+from .metrics import timed
+from .names import commodity_names
+
+if TYPE_CHECKING:
+    from .storage import Storage
+
 
 class FleetCarrier:
 
-    def __init__(self) -> None:
+    def __init__(self, persistence: PersistenceWorker | None = None) -> None:
         self.cargo: dict[str, int] = {}
         self.lastSync: str | None = None
         self.callSign: str | None = None
+        # per commodity timestamp of the last change in stock
+        self.changed: dict[str, str] = {}
         self.filePath: str | None = None
         self.autoSave: bool = False
+        self._persistence = persistence
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self._avoided_writes = 0
+        self._delta: dict[str, int] = {}
+        self._storage: 'Storage | None' = None
 
-    def load(self, file_path: str, auto_save: bool = True) -> None:
-        self.filePath = file_path
+    def load(self, source: 'str | Storage', auto_save: bool = True) -> None:
         self.autoSave = auto_save
-        if path.isfile(file_path):
-            data = json.load(open(file_path, 'r', encoding='utf-8'))
+        if isinstance(source, str):
+            self._storage = None
+            self.filePath = source
+            data = json.load(open(source, 'r', encoding='utf-8')) if path.isfile(source) else None
+        else:
+            self._storage = source
+            self.filePath = source.carrier_key
+            data = source.load_carrier()
+        if data:
             self.cargo = data.get('cargo', {})
             self.lastSync = data.get('lastSync', None)
             self.callSign = data.get('callSign', None)
+            self.changed = data.get('changed', {})
+
+    @property
+    def avoided_writes(self) -> int:
+        return self._avoided_writes
+
+    @property
+    def delta(self) -> dict[str, int]:
+        return self._delta
 
+    @contextmanager
+    def batch(self) -> Iterator[Self]:
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batch_dirty:
+                self._batch_dirty = False
+                self.save()
+
+    def apply_many(self, deltas: Iterable[tuple[str, int]]) -> None:
+        with self.batch():
+            for commodity, qty in deltas:
+                if qty >= 0:
+                    self.add(commodity, qty)
+                else:
+                    self.remove(commodity, -qty)
+
+    @timed("FleetCarrier.save")
     def save(self, file_path: str | None = None) -> None:
+        if file_path is None and self._batch_depth:
+            if self._batch_dirty:
+                self._avoided_writes += 1
+            self._batch_dirty = True
+            return
         if file_path is None and self.autoSave:
+            if self._persistence and self.filePath:
+                self._persistence.mark_dirty(self.filePath, self._write_file)
+                return
             file_path = self.filePath
         if file_path is None:
             return
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(self, file, ensure_ascii=False, indent=4, cls=FleetCarrierEncoder, sort_keys=True)
+        self._write(file_path)
+
+    def _write_file(self) -> None:
+        if self.filePath:
+            self._write(self.filePath)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in self.__dict__.items() if not k.startswith('_')}
+
+    @timed("FleetCarrier.save.write")
+    def _write(self, file_path: str) -> None:
+        with self._lock:
+            data = self.to_dict()
+        if self._storage and file_path == self.filePath:
+            self._storage.save_carrier(data)
+        else:
+            atomic_write(file_path, json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True))
 
     def sync_data(self, data: CAPIData) -> Self | None:
-        self.callSign = data['name']['callsign']
-        if not self.callSign:
+        call_sign = data['name']['callsign']
+        if not call_sign:
+            self.callSign = call_sign
             return None
-        self.lastSync = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
-
-        self.cargo = {}
+        cargo: dict[str, int] = {}
         for c in data['cargo']:
-            cn = c['commodity'].lower()
-            if cn in self.cargo:
-                self.cargo[cn] += c['qty']
+            cn = commodity_names.symbol(c['commodity'])
+            if cn in cargo:
+                cargo[cn] += c['qty']
             else:
-                self.cargo[cn] = c['qty']
-        self.save()
+                cargo[cn] = c['qty']
+        now = self._now()
+        with self._lock:
+            delta = {k: cargo.get(k, 0) - self.cargo.get(k, 0) for k in cargo.keys() | self.cargo.keys()
+                     if cargo.get(k, 0) != self.cargo.get(k, 0)}
+            for commodity in delta:
+                self.changed[commodity] = now
+            # lastSync is read back after a restart, so a sync that changed nothing still has to be saved
+            changed = bool(delta) or call_sign != self.callSign or now != self.lastSync
+            self.callSign = call_sign
+            self.lastSync = now
+            self.cargo = cargo
+            self._delta = delta
+        if changed:
+            self.save()
         return self
 
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
+
     def get(self, commodity: str) -> int:
         return self.cargo.get(commodity, 0)
 
     def add(self, commodity: str, qty: int) -> int:
-        if commodity in self.cargo:
-            self.cargo[commodity] += qty
-        else:
-            self.cargo[commodity] = qty
+        with self._lock:
+            if commodity in self.cargo:
+                self.cargo[commodity] += qty
+            else:
+                self.cargo[commodity] = qty
+            self.changed[commodity] = self._now()
         self.save()
         return self.cargo[commodity]
 
     def remove(self, commodity: str, qty: int) -> int:
-        if commodity in self.cargo:
-            self.cargo[commodity] -= qty
-            if self.cargo[commodity] < 0:
+        with self._lock:
+            if commodity in self.cargo:
+                self.cargo[commodity] -= qty
+                if self.cargo[commodity] < 0:
+                    self.cargo[commodity] = 0
+            else:
                 self.cargo[commodity] = 0
-        else:
-            self.cargo[commodity] = 0
+            self.changed[commodity] = self._now()
         self.save()
         return self.cargo[commodity]
 
@@ -72,5 +168,5 @@ class FleetCarrier:
 class FleetCarrierEncoder(json.JSONEncoder):
     def default(self, o: Any) -> Any:
         if isinstance(o, FleetCarrier):
-            return o.__dict__
+            return o.to_dict()
         return super().default(o)
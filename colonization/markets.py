@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from os import path
+from typing import Any, Iterable
+
+from .persistence import PersistenceWorker, atomic_write
+
+EMPTY: frozenset[str] = frozenset()
+
+
+class MarketCache:
+    MAX_SIZE = 100
+    TTL = 7 * 24 * 3600
+
+    def __init__(self, persistence: PersistenceWorker | None = None, max_size: int = MAX_SIZE,
+                 ttl: float = TTL) -> None:
+        self.maxSize = max_size
+        self.ttl = ttl
+        self.filePath: str | None = None
+        self._markets: OrderedDict[int, tuple[float, frozenset[str]]] = OrderedDict()
+        self._persistence = persistence
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._markets)
+
+    def load(self, file_path: str) -> None:
+        self.filePath = file_path
+        if not path.isfile(file_path):
+            return
+        data = json.load(open(file_path, 'r', encoding='utf-8'))
+        entries = sorted(data.items(), key=lambda i: i[1].get('timestamp', 0))
+        for market_id, market in entries:
+            self.put(int(market_id), market.get('commodities', []), market.get('timestamp'), save=False)
+
+    def put(self, market_id: int, commodities: Iterable[str], timestamp: float | None = None,
+            save: bool = True) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._markets[market_id] = (timestamp, frozenset(commodities))
+            self._markets.move_to_end(market_id)
+            self._evict()
+        if save:
+            self.save()
+
+    def get(self, market_id: int | None) -> frozenset[str]:
+        with self._lock:
+            market = self._markets.get(market_id)  # type: ignore
+            if market is None:
+                return EMPTY
+            if time.time() - market[0] > self.ttl:
+                del self._markets[market_id]  # type: ignore
+                return EMPTY
+            self._markets.move_to_end(market_id)  # type: ignore
+            return market[1]
+
+    def save(self) -> None:
+        if self.filePath is None:
+            return
+        if self._persistence:
+            self._persistence.mark_dirty(self.filePath, self._write)
+        else:
+            self._write()
+
+    def _evict(self) -> None:
+        now = time.time()
+        expired = [k for k, (timestamp, _) in self._markets.items() if now - timestamp > self.ttl]
+        for k in expired:
+            del self._markets[k]
+        while len(self._markets) > self.maxSize:
+            self._markets.popitem(last=False)
+
+    def _write(self) -> None:
+        if self.filePath is None:
+            return
+        with self._lock:
+            data: dict[str, Any] = {
+                str(k): {'timestamp': timestamp, 'commodities': sorted(commodities)}
+                for k, (timestamp, commodities) in self._markets.items()
+            }
+        atomic_write(self.filePath, json.dumps(data, ensure_ascii=False, indent=4))
@@ -0,0 +1,91 @@
+import functools
+import time
+from array import array
+from typing import Any, Callable, TypeVar
+
+from EDMCLogging import get_main_logger
+
+logger = get_main_logger()
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class Histogram:
+    BUCKETS = 24
+    BASE = 0.00001  # upper bound of the first bucket, in seconds; each next bucket doubles it
+
+    def __init__(self) -> None:
+        self.counts = array('L', [0] * self.BUCKETS)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        bucket = 0
+        bound = self.BASE
+        while seconds > bound and bucket < self.BUCKETS - 1:
+            bucket += 1
+            bound *= 2
+        self.counts[bucket] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        target = p * self.count
+        seen = 0
+        bound = self.BASE
+        for c in self.counts:
+            seen += c
+            if seen >= target:
+                return min(bound, self.max)
+            bound *= 2
+        return self.max
+
+
+class Metrics:
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.histograms: dict[str, Histogram] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def reset(self) -> None:
+        self.histograms = {}
+
+    def summary(self) -> list[str]:
+        lines = []
+        for name, h in sorted(self.histograms.items()):
+            lines.append("{:<45} {:>7d} p50 {:>8.2f}ms p95 {:>8.2f}ms max {:>8.2f}ms".format(
+                name, h.count, h.percentile(0.5) * 1000, h.percentile(0.95) * 1000, h.max * 1000))
+        return lines
+
+    def dump(self) -> None:
+        if not self.histograms:
+            logger.info("No performance metrics collected")
+        for line in self.summary():
+            logger.info(line)
+
+
+metrics = Metrics()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper  # type: ignore
+    return decorator
@@ -0,0 +1,43 @@
+import re
+import sys
+
+
+class CommodityNames:
+    MAX_SIZE = 4096
+    PATTERN = re.compile('^\\$(.*)_')
+
+    def __init__(self, max_size: int = MAX_SIZE) -> None:
+        self.maxSize = max_size
+        self.hits = 0
+        self.misses = 0
+        self._symbols: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def symbol(self, name: str) -> str:
+        symbol = self._symbols.get(name)
+        if symbol is not None:
+            self.hits += 1
+            return symbol
+        self.misses += 1
+        m = self.PATTERN.search(name)
+        symbol = sys.intern(m.group(1).lower() if m else name.lower())
+        if len(self._symbols) >= self.maxSize:
+            self._symbols.clear()
+        self._symbols[name] = symbol
+        return symbol
+
+    def reset(self) -> None:
+        self._symbols.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0.0
+        return "{:<45} {:>7d} hits {:>7d} misses {:>6.1f}%".format(
+            "commodity names", self.hits, self.misses, ratio)
+
+
+commodity_names = CommodityNames()
@@ -0,0 +1,177 @@
+from array import array
+from itertools import compress
+from operator import sub
+from typing import Any, Hashable, Iterable, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class NeedsMatrix:
+    COLUMNS = 64
+
+    def __init__(self, symbols: Iterable[str] = ()) -> None:
+        self.symbols: list[str] = []
+        self.index: dict[str, int] = {}
+        self._cols = self.COLUMNS
+        self._keys: list[Hashable] = []
+        self._rows: dict[Hashable, int] = {}
+        self._columns: list[list[int]] = []
+        # [construction, commodity] matrices stored row by row in flat arrays
+        self._required = array('q')
+        self._provided = array('q')
+        self._present = array('b')
+        self._totals = array('q', bytes(8 * self._cols))
+        self._refs = array('l', bytes(array('l').itemsize * self._cols))
+        for symbol in symbols:
+            self.column(symbol)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    def column(self, symbol: str) -> int:
+        col = self.index.get(symbol)
+        if col is None:
+            col = len(self.symbols)
+            if col == self._cols:
+                self._grow(self._cols * 2)
+            self.symbols.append(symbol)
+            self.index[symbol] = col
+        return col
+
+    def set_row(self, key: Hashable, required: dict[str, Any]) -> None:
+        for symbol in required:
+            self.column(symbol)
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            self._rows[key] = row
+            self._keys.append(key)
+            self._columns.append([])
+            zeros = bytes(self._cols)
+            self._required.frombytes(zeros * 8)
+            self._provided.frombytes(zeros * 8)
+            self._present.frombytes(zeros)
+        else:
+            self._account(row, -1)
+            start = row * self._cols
+            for col in self._columns[row]:
+                self._required[start + col] = self._provided[start + col] = self._present[start + col] = 0
+        start = row * self._cols
+        columns = []
+        for symbol, resource in required.items():
+            col = self.index[symbol]
+            i = start + col
+            self._required[i] = resource.required
+            self._provided[i] = resource.provided
+            self._present[i] = 1
+            columns.append(col)
+        self._columns[row] = columns
+        self._account(row, 1)
+
+    def remove_row(self, key: Hashable) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._account(row, -1)
+        last = len(self._keys) - 1
+        cols = self._cols
+        if row != last:
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+            self._columns[row] = self._columns[last]
+            for matrix in (self._required, self._provided, self._present):
+                matrix[row * cols:(row + 1) * cols] = matrix[last * cols:(last + 1) * cols]
+        self._keys.pop()
+        self._columns.pop()
+        for matrix in (self._required, self._provided, self._present):
+            del matrix[last * cols:]
+
+    def set_provided(self, key: Hashable, symbol: str, provided: int) -> None:
+        row = self._rows.get(key)
+        col = self.index.get(symbol)
+        if row is None or col is None:
+            return
+        i = row * self._cols + col
+        if not self._present[i]:
+            return
+        self._totals[col] -= provided - self._provided[i]
+        self._provided[i] = provided
+
+    def totals(self) -> dict[str, int]:
+        return {symbol: self._totals[col] for symbol, col in sorted(self.index.items()) if self._refs[col]}
+
+    def columns(self, key: Hashable = None) -> list[int]:
+        if key is None:
+            return list(compress(range(len(self.symbols)), self._refs))
+        return self._columns[self._rows[key]]
+
+    def needed(self, key: Hashable = None) -> Sequence[int]:
+        if key is None:
+            return self._totals
+        row = self._rows[key]
+        cols = self._cols
+        if numpy is not None:
+            return (self._view(self._required, row) - self._view(self._provided, row)).tolist()
+        return array('q', map(sub, self._required[row * cols:(row + 1) * cols],
+                              self._provided[row * cols:(row + 1) * cols]))
+
+    def total_needed(self, key: Hashable = None) -> int:
+        if key is None:
+            return sum(self._totals)
+        row = self._rows[key]
+        start = row * self._cols
+        if numpy is not None:
+            return int(self._view(self._required, row).sum() - self._view(self._provided, row).sum())
+        return sum(self._required[start:start + self._cols]) - sum(self._provided[start:start + self._cols])
+
+    def vector(self, values: dict[str, int]) -> array:
+        vector = array('q', bytes(8 * self._cols))
+        index = self.index
+        for symbol, value in values.items():
+            col = index.get(symbol)
+            if col is not None:
+                vector[col] = value
+        return vector
+
+    def buy(self, columns: list[int], needed: Sequence[int], cargo: array, carrier: array) -> list[int]:
+        if numpy is not None:
+            needed = numpy.asarray(needed, dtype=numpy.int64)[columns]
+            return numpy.maximum(needed - numpy.frombuffer(cargo, dtype=numpy.int64)[columns]
+                                 - numpy.frombuffer(carrier, dtype=numpy.int64)[columns], 0).tolist()
+        buy = []
+        for col in columns:
+            n = needed[col] - cargo[col] - carrier[col]
+            buy.append(n if n > 0 else 0)
+        return buy
+
+    def _view(self, matrix: array, row: int) -> Any:
+        return numpy.frombuffer(matrix, dtype=numpy.int64, count=self._cols, offset=row * self._cols * 8)
+
+    def _account(self, row: int, sign: int) -> None:
+        start = row * self._cols
+        totals = self._totals
+        refs = self._refs
+        required = self._required
+        provided = self._provided
+        for col in self._columns[row]:
+            totals[col] += sign * (required[start + col] - provided[start + col])
+            refs[col] += sign
+
+    def _grow(self, cols: int) -> None:
+        old = self._cols
+        for name, code in (('_required', 'q'), ('_provided', 'q'), ('_present', 'b')):
+            matrix: array = getattr(self, name)
+            grown = array(code, bytes(matrix.itemsize * cols * len(self._keys)))
+            for row in range(len(self._keys)):
+                grown[row * cols:row * cols + old] = matrix[row * old:(row + 1) * old]
+            setattr(self, name, grown)
+        self._totals.frombytes(bytes(8 * (cols - old)))
+        self._refs.frombytes(bytes(self._refs.itemsize * (cols - old)))
+        self._cols = cols
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Callable
+
+from EDMCLogging import get_main_logger
+
+logger = get_main_logger()
+
+
+def atomic_write(file_path: str, text: str) -> None:
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, file_path)
+
+
+class PersistenceWorker:
+    DELAY = 2.0
+
+    def __init__(self, delay: float = DELAY) -> None:
+        self.delay = delay
+        self._pending: dict[str, Callable[[], None]] = {}
+        self._since: float = 0.0
+        self._running = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="colonization-persistence", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def mark_dirty(self, key: str, writer: Callable[[], None]) -> None:
+        with self._cond:
+            if not self._pending:
+                self._since = time.monotonic()
+            self._pending[key] = writer
+            self._cond.notify()
+
+    def flush(self) -> None:
+        with self._cond:
+            pending = self._pending
+            self._pending = {}
+        self._write(pending)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                remaining = self._since + self.delay - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                pending = self._pending
+                self._pending = {}
+            self._write(pending)
+
+    def _write(self, pending: dict[str, Callable[[], None]]) -> None:
+        with self._write_lock:
+            for key, writer in pending.items():
+                try:
+                    writer()
+                except Exception:
+                    logger.exception("Failed to write %s", key)
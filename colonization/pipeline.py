@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from EDMCLogging import get_main_logger
+
+from .metrics import metrics
+
+logger = get_main_logger()
+
+STATE_FIELDS = ('StationName', 'SystemName', 'MarketID')
+
+Apply = Callable[[dict[str, Any], dict[str, Any]], None]
+
+
+def snapshot_state(state: dict[str, Any]) -> dict[str, Any]:
+    snapshot = {k: state.get(k) for k in STATE_FIELDS}
+    if 'Cargo' in state:
+        snapshot['Cargo'] = dict(state['Cargo'])
+    return snapshot
+
+
+class JournalPipeline:
+    MAX_SIZE = 1000
+
+    def __init__(self, apply: Apply, max_size: int = MAX_SIZE) -> None:
+        self._apply = apply
+        self._queue: queue.Queue[tuple[float, Any, dict[str, Any] | None] | None] = queue.Queue(max_size)
+        self._thread: threading.Thread | None = None
+        self.processed = 0
+        self.maxDepth = 0
+        self.overflows = 0
+        self.lastLag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def idle(self) -> bool:
+        return self._queue.unfinished_tasks == 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="colonization-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, entry: dict[str, Any], state: dict[str, Any]) -> bool:
+        # called from the Tk thread, a full queue must never block it
+        try:
+            self._queue.put_nowait((time.perf_counter(), dict(entry), snapshot_state(state)))
+        except queue.Full:
+            self.overflows += 1
+            return False
+        depth = self._queue.qsize()
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+        return True
+
+    def call(self, func: Callable[[], None]) -> None:
+        self._queue.put((time.perf_counter(), func, None))
+
+    def wait(self) -> None:
+        self._queue.join()
+
+    def summary(self) -> str:
+        return "{:<45} {:>7d} events depth {:>4d} max {:>4d} full {:>4d} lag {:>8.2f}ms".format(
+            "journal pipeline", self.processed, self.depth, self.maxDepth, self.overflows, self.lastLag * 1000)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                queued, entry, state = item
+                if callable(entry):
+                    entry()
+                    continue
+                try:
+                    self._apply(entry, state)
+                except Exception:  # pylint: disable=W0718
+                    logger.exception("Cannot process journal event %s", entry.get('event'))
+                self.lastLag = time.perf_counter() - queued
+                self.processed += 1
+                if metrics.enabled:
+                    metrics.record("journal.lag", self.lastLag)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,155 @@
+import math
+import time
+from typing import Iterable, NamedTuple
+
+
+class Load(NamedTuple):
+    commodity: str
+    carrier: bool
+    tons: int
+
+
+class HaulPlan:
+    __slots__ = ('holds', 'trips', 'tons', 'capacity', 'lowerBound', 'optimal', 'elapsed')
+
+    def __init__(self, holds: list[tuple[Load, int]], trips: list[list[Load]], capacity: int, lower_bound: int,
+                 optimal: bool, elapsed: float) -> None:
+        # full holds of a single commodity as (load, number of trips), then the mixed trips
+        self.holds = holds
+        self.trips = trips
+        self.tons = sum(load.tons * count for load, count in holds) + sum(
+            load.tons for trip in trips for load in trip)
+        self.capacity = capacity
+        self.lowerBound = lower_bound
+        self.optimal = optimal
+        self.elapsed = elapsed
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self.holds) + len(self.trips)
+
+
+class _Timeout(Exception):
+    pass
+
+
+class HaulPlanner:
+    TIME_BUDGET = 0.02
+    EXACT_LIMIT = 16
+
+    def __init__(self, time_budget: float = TIME_BUDGET, exact_limit: int = EXACT_LIMIT) -> None:
+        self.timeBudget = time_budget
+        self.exactLimit = exact_limit
+        self.hits = 0
+        self.solves = 0
+        self._key: tuple | None = None
+        self._plan: HaulPlan | None = None
+
+    @staticmethod
+    def loads(needs: dict[str, int], carrier: dict[str, int], cargo: dict[str, int]) -> list[Load]:
+        loads = []
+        for commodity, need in needs.items():
+            need -= cargo.get(commodity, 0)
+            if need <= 0:
+                continue
+            from_carrier = min(need, max(carrier.get(commodity, 0), 0))
+            if from_carrier:
+                loads.append(Load(commodity, True, from_carrier))
+            if need > from_carrier:
+                loads.append(Load(commodity, False, need - from_carrier))
+        return loads
+
+    def plan(self, needs: dict[str, int], carrier: dict[str, int], cargo: dict[str, int],
+             capacity: int) -> HaulPlan:
+        loads = self.loads(needs, carrier, cargo)
+        key = (capacity, tuple(loads))
+        if key == self._key and self._plan is not None:
+            self.hits += 1
+            return self._plan
+        self._plan = self.solve(loads, capacity)
+        self._key = key
+        self.solves += 1
+        return self._plan
+
+    def solve(self, loads: Iterable[Load], capacity: int) -> HaulPlan:
+        start = time.perf_counter()
+        if capacity <= 0:
+            return HaulPlan([], [], capacity, 0, True, 0.0)
+        holds: list[tuple[Load, int]] = []
+        parts: list[Load] = []
+        # whole holds of a single commodity first, only the remainders need packing
+        for load in loads:
+            full, rest = divmod(load.tons, capacity)
+            if full:
+                holds.append((load._replace(tons=capacity), full))
+            if rest:
+                parts.append(load._replace(tons=rest))
+        parts.sort(key=lambda load: load.tons, reverse=True)
+        sizes = [load.tons for load in parts]
+
+        lower = math.ceil(sum(sizes) / capacity)
+        bins = self._first_fit(sizes, capacity)
+        optimal = max(bins) + 1 == lower if bins else True
+        if not optimal and len(sizes) <= self.exactLimit:
+            bins, optimal = self._exact(sizes, capacity, bins, lower, start + self.timeBudget)
+
+        trips: list[list[Load]] = [[] for _ in range(max(bins) + 1 if bins else 0)]
+        for load, b in zip(parts, bins):
+            trips[b].append(load)
+        return HaulPlan(holds, trips, capacity, sum(count for _, count in holds) + lower, optimal,
+                        time.perf_counter() - start)
+
+    @staticmethod
+    def _first_fit(sizes: list[int], capacity: int) -> list[int]:
+        free: list[int] = []
+        bins = []
+        for size in sizes:
+            for b, room in enumerate(free):
+                if size <= room:
+                    free[b] -= size
+                    bins.append(b)
+                    break
+            else:
+                free.append(capacity - size)
+                bins.append(len(free) - 1)
+        return bins
+
+    @staticmethod
+    def _exact(sizes: list[int], capacity: int, bins: list[int], lower: int,
+               deadline: float) -> tuple[list[int], bool]:
+        best = bins[:]
+        best_count = max(bins) + 1
+        used: list[int] = []
+        assign = [0] * len(sizes)
+        nodes = 0
+
+        def search(i: int) -> bool:
+            nonlocal best, best_count, nodes
+            nodes += 1
+            if not nodes & 255 and time.perf_counter() > deadline:
+                raise _Timeout()
+            if i == len(sizes):
+                best, best_count = assign[:], len(used)
+                return best_count == lower
+            size = sizes[i]
+            tried = set()
+            for b, load in enumerate(used):
+                if load + size <= capacity and load not in tried:
+                    tried.add(load)
+                    used[b] += size
+                    assign[i] = b
+                    if search(i + 1):
+                        return True
+                    used[b] -= size
+            if len(used) + 1 < best_count:
+                used.append(size)
+                assign[i] = len(used) - 1
+                if search(i + 1):
+                    return True
+                used.pop()
+            return False
+
+        try:
+            search(0)
+        except _Timeout:
+            return best, best_count == lower
+        return best, True
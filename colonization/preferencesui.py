@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from functools import partial
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 
 from companion import session, Session
 import myNotebook as nb
@@ -10,7 +10,10 @@ from .data import ptl
 from .colonization import ColonizationPlugin
 from .colonization import Construction
 from .colonization import FleetCarrier
-from .config import Config
+from .config import Config, settings
+from .metrics import metrics
+from .names import commodity_names
+from .storage import STORAGE_BACKENDS
 
 
 class PreferencesUi:
@@ -24,6 +27,7 @@ class PreferencesUi:
         self.frame: Optional[ttk.Frame] = None
         self.fc_callsign: Optional[tk.Label] = None
         self.fc_last_update: Optional[tk.Label] = None
+        self.backfill_status: Optional[tk.Label] = None
         self.construction_list: Optional[ttk.Frame] = None
         self.ignore_fc_update: Optional[tk.Variable] = None
         self.show_station_name: Optional[tk.Variable] = None
@@ -31,8 +35,12 @@ class PreferencesUi:
         self.var_categories: Optional[tk.Variable] | None = None
         self.var_collapsable: Optional[tk.Variable] | None = None
         self.var_rows: Optional[tk.Variable] | None = None
+        self.perf_metrics: Optional[tk.Variable] = None
+        self.var_storage: Optional[tk.Variable] = None
+        self.perf_summary: Optional[tk.Label] = None
 
     def plugin_prefs(self, parent: ttk.Notebook, cmdr: str, is_beta: bool) -> nb.Frame:  # pylint: disable=W0613
+        self.plugin.ensure_loaded()
         self.frame = nb.Frame(parent)
         self.frame.columnconfigure(1, weight=1)
         self.frame.grid(sticky=tk.EW)
@@ -50,6 +58,10 @@ class PreferencesUi:
         self.ignore_fc_update = Config.IGNORE_FC_UPDATE.tk_var()
         nb.Checkbutton(frame, text=ptl("Ignore event based cAPI Fleet Carrier update"), variable=self.ignore_fc_update).grid(
             row=4, columnspan=2, sticky=tk.W)
+        nb.Button(frame, text=ptl("Import missed deliveries from journals"), command=self.backfill_journals).grid(
+            row=5, column=0, sticky=tk.EW, pady=5)
+        self.backfill_status = nb.Label(frame, text="")
+        self.backfill_status.grid(row=5, column=1, sticky=tk.W)
 
         ttk.Separator(self.frame, orient=tk.HORIZONTAL).grid(row=self.next_row(), sticky=tk.EW, padx=self.PAD_X)
 
@@ -80,6 +92,22 @@ class PreferencesUi:
         self.construction_list.grid(row=self.next_row(), column=0, sticky=tk.EW, padx=self.PAD_X, pady=self.PAD_Y)
         self.build_construction_list()
 
+        ttk.Separator(self.frame, orient=tk.HORIZONTAL).grid(row=self.next_row(), sticky=tk.EW, padx=self.PAD_X)
+
+        perf = ttk.Frame(self.frame, style='nb.TFrame')
+        perf.grid(row=self.next_row(), column=0, sticky=tk.EW, padx=self.PAD_X, pady=self.PAD_Y)
+        self.perf_metrics = Config.PERF_METRICS.tk_var()
+        nb.Checkbutton(perf, text=ptl("Collect performance metrics"), variable=self.perf_metrics).grid(
+            row=0, column=0, sticky=tk.W)
+        nb.Button(perf, text=ptl("Write metrics to log"), command=metrics.dump).grid(row=0, column=1, padx=5)
+        nb.Label(perf, text=ptl("Storage (after restart):")).grid(row=1, column=0, sticky=tk.W)
+        self.var_storage = Config.STORAGE.tk_string_var()
+        nb.OptionMenu(perf, self.var_storage, self.var_storage.get(), *STORAGE_BACKENDS).grid(
+            row=1, column=1, padx=1, pady=1, sticky=tk.W)
+        self.perf_summary = nb.Label(perf, text="", justify=tk.LEFT, font=("Courier", 8))
+        self.perf_summary.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+        self.update_perf_summary()
+
         return self.frame
 
     def build_construction_list(self) -> None:
@@ -100,6 +128,25 @@ class PreferencesUi:
                        command=partial(self.remove_construction, c)).grid(row=row, column=2, pady=2, padx=5)
             row += 1
 
+        archive = self.plugin.get_archive()
+        if archive:
+            nb.Label(self.construction_list, text=ptl("Archived construction sites")).grid(row=row, column=0,
+                                                                                        columnspan=2)
+            row += 1
+        for c in archive:
+            nb.Label(self.construction_list, text=c.system).grid(row=row, column=0, sticky=tk.W)
+            nb.Label(self.construction_list, text=c.get_name()).grid(row=row, column=1, sticky=tk.W)
+            row += 1
+
+    def update_perf_summary(self) -> None:
+        if self.perf_summary:
+            lines = metrics.summary()
+            if commodity_names.hits or commodity_names.misses:
+                lines.append(commodity_names.summary())
+            if self.plugin.pipeline.processed:
+                lines.append(self.plugin.pipeline.summary())
+            self.perf_summary['text'] = "\n".join(lines) if lines else ptl("No performance metrics collected")
+
     def next_row(self) -> int:
         self.row += 1
         return self.row
@@ -120,33 +167,53 @@ class PreferencesUi:
             self.fc_callsign['text'] = str(carrier.callSign)
             self.fc_last_update['text'] = str(carrier.lastSync)
 
+    def backfill_journals(self) -> None:
+        if self.plugin.backfill_journals(self._on_backfill) and self.backfill_status:
+            self.backfill_status['text'] = ptl("Importing...")
+
+    def _on_backfill(self, count: int) -> None:
+        if self.backfill_status and self.backfill_status.winfo_exists():
+            self.backfill_status['text'] = ptl("{} events imported").format(count)
+            self.build_construction_list()
+
     def call_capi_fc(self) -> None:
         if session.state == Session.STATE_OK:
             if self.fc_last_update:
                 self.fc_last_update['text'] = "Updating..."
-
-            #
-            carrier = session.requests_session.get(
-                session.capi_host_for_galaxy() + session.FRONTIER_CAPI_PATH_FLEETCARRIER)
-            data = carrier.json()
-            self.plugin.capi_fleetcarrier(data)
-            if self.fc_callsign and self.fc_last_update:
-                if self.plugin.carrier and self.plugin.carrier.callSign:
-                    self.fc_callsign['text'] = str(self.plugin.carrier.callSign)
-                    self.fc_last_update['text'] = str(self.plugin.carrier.lastSync)
-                else:
-                    self.fc_callsign['text'] = ""
-                    self.fc_last_update['text'] = "Missing Fleet Carrier data"
+            self.plugin.fetch_carrier(session.capi_host_for_galaxy() + session.FRONTIER_CAPI_PATH_FLEETCARRIER,
+                                      self._fetch_capi, self._on_capi_fc)
         elif self.fc_last_update:
             self.fc_last_update['text'] = "cAPI session is not open."
 
+    @staticmethod
+    def _fetch_capi(url: str, timeout: float) -> Any:
+        response = session.requests_session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _on_capi_fc(self, error: Exception | None) -> None:
+        if self.fc_callsign and self.fc_last_update and self.fc_last_update.winfo_exists():
+            if error is not None:
+                self.fc_last_update['text'] = "Fleet Carrier update failed"
+            elif self.plugin.carrier and self.plugin.carrier.callSign:
+                self.fc_callsign['text'] = str(self.plugin.carrier.callSign)
+                self.fc_last_update['text'] = str(self.plugin.carrier.lastSync)
+            else:
+                self.fc_callsign['text'] = ""
+                self.fc_last_update['text'] = "Missing Fleet Carrier data"
+
     def prefs_changed(self, cmdr:str, is_beta:bool) -> None:  # pylint: disable=W0613
         if self.ignore_fc_update:
-            Config.IGNORE_FC_UPDATE.set(self.ignore_fc_update.get())
+            settings[Config.IGNORE_FC_UPDATE] = self.ignore_fc_update.get()
         if self.show_totals:
-            Config.SHOW_TOTALS.set(self.show_totals.get())
+            settings[Config.SHOW_TOTALS] = self.show_totals.get()
         if self.show_station_name:
-            Config.SHOW_STATION_NAME.set(self.show_station_name.get())
+            settings[Config.SHOW_STATION_NAME] = self.show_station_name.get()
+        if self.perf_metrics:
+            settings[Config.PERF_METRICS] = self.perf_metrics.get()
+            metrics.enabled = settings.perf_metrics
+        if self.var_storage:
+            settings[Config.STORAGE] = self.var_storage.get()
 
         self.plugin.update_language()
         self.plugin.update_display()
@@ -154,23 +221,23 @@ class PreferencesUi:
 
     def _on_categories_change(self) -> None:
         value: bool = self.var_categories.get()
-        if value != Config.CATEGORIES.get():
+        if value != settings.categories:
             self.plugin.ui.CATEGORIES = value
-            Config.CATEGORIES.set(value)
+            settings[Config.CATEGORIES] = value
             self.plugin.update_display()
 
     def _on_collapsable_change(self) -> None:
         value: bool = self.var_collapsable.get()
-        if value != Config.COLLAPSABLE.get():
+        if value != settings.collapsable:
             self.plugin.ui.COLLAPSABLE = value
-            Config.COLLAPSABLE.set(value)
+            settings[Config.COLLAPSABLE] = value
             self.plugin.update_display()
 
     def _on_rows_change(self, *_) -> None:
         value: int = int(self.var_rows.get())
-        if value != Config.ROWS.get():
+        if value != settings.rows:
             self.plugin.ui.ROWS = value
-            Config.ROWS.set(value)
+            settings[Config.ROWS] = value
             self.plugin.ui.reset_frame()
             self.plugin.update_display()
 
@@ -0,0 +1,355 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from os import path
+from typing import Any
+
+from EDMCLogging import get_main_logger
+
+from .construction import Construction, ConstructionEncoder, ConstructionRegistry
+from .deltalog import DeltaLog
+from .persistence import atomic_write
+
+logger = get_main_logger()
+
+Batch = tuple[Any, Any]
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+
+def apply_record(registry: ConstructionRegistry, record: dict[str, Any]) -> None:
+    op = record.get('op')
+    if op in ('track', 'depot'):
+        registry.add(Construction.from_dict(record['construction']))
+    elif op == 'deliver':
+        found = registry.get(record['market_id'])
+        if found:
+            registry.set_provided(found, record['commodity'], record['provided'])
+    elif op == 'remove':
+        registry.remove(record['market_id'])
+    else:
+        logger.warning("Unknown storage record %s", op)
+
+
+class Storage(ABC):
+    name = ''
+    incremental = True
+
+    def __init__(self, save_dir: str) -> None:
+        self.saveDir = save_dir
+        self.archivePath = path.join(save_dir, "archive.json")
+        self.baseline: float | None = None
+        self.compact = False
+
+    @property
+    @abstractmethod
+    def key(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def carrier_key(self) -> str:
+        pass
+
+    @abstractmethod
+    def load(self) -> ConstructionRegistry:
+        pass
+
+    @abstractmethod
+    def record(self, record: dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def take(self, registry: ConstructionRegistry, snapshot: bool) -> Batch:
+        pass
+
+    @abstractmethod
+    def write(self, batch: Batch) -> None:
+        pass
+
+    def deliveries(self, market_id: int | None = None, since: str | None = None) -> list[tuple[Any, ...]]:
+        return []
+
+    def load_archive(self) -> list[Construction]:
+        if not path.isfile(self.archivePath):
+            return []
+        with open(self.archivePath, 'r', encoding='utf-8') as file:
+            return [Construction.from_dict(c) for c in json.load(file)]
+
+    def archive(self, constructions: list[dict[str, Any]]) -> None:
+        archived = {c.market_id: c.to_dict() for c in self.load_archive()}
+        for c in constructions:
+            archived[c['market_id']] = c
+        atomic_write(self.archivePath, json.dumps(list(archived.values()), ensure_ascii=False, indent=4))
+
+    @abstractmethod
+    def load_carrier(self) -> dict[str, Any] | None:
+        pass
+
+    @abstractmethod
+    def save_carrier(self, data: dict[str, Any]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStorage(Storage):
+    name = 'json'
+
+    def __init__(self, save_dir: str, delta_log: bool = True) -> None:
+        super().__init__(save_dir)
+        self.incremental = delta_log
+        self.filePath = path.join(save_dir, "constructions.json")
+        self.deltaLog = DeltaLog(path.join(save_dir, "constructions.log"))
+
+    @property
+    def key(self) -> str:
+        return self.filePath
+
+    @property
+    def carrier_key(self) -> str:
+        return path.join(self.saveDir, "fccargo.json")
+
+    def load(self) -> ConstructionRegistry:
+        registry = ConstructionRegistry()
+        if path.isfile(self.filePath):
+            self.baseline = path.getmtime(self.filePath)
+            for c in json.load(open(self.filePath, 'r', encoding='utf-8')):
+                registry.add(Construction.from_dict(c))
+        records = self.deltaLog.read()
+        if records:
+            self.baseline = max(self.baseline or 0.0, path.getmtime(self.deltaLog.filePath))
+        for record in records:
+            apply_record(registry, record)
+        self.compact = bool(records) and (not self.incremental or self.deltaLog.needs_compaction([]))
+        return registry
+
+    def record(self, record: dict[str, Any]) -> None:
+        self.deltaLog.record(record)
+
+    def take(self, registry: ConstructionRegistry, snapshot: bool) -> Batch:
+        lines = self.deltaLog.take_pending()
+        if snapshot or self.deltaLog.needs_compaction(lines):
+            return None, json.dumps(registry, ensure_ascii=False, indent=4, cls=ConstructionEncoder)
+        return lines, None
+
+    def write(self, batch: Batch) -> None:
+        lines, data = batch
+        if data is not None:
+            atomic_write(self.filePath, data)
+            self.deltaLog.reset()
+        else:
+            self.deltaLog.write(lines)
+
+    def load_carrier(self) -> dict[str, Any] | None:
+        if not path.isfile(self.carrier_key):
+            return None
+        return json.load(open(self.carrier_key, 'r', encoding='utf-8'))
+
+    def save_carrier(self, data: dict[str, Any]) -> None:
+        atomic_write(self.carrier_key, json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True))
+
+
+class SqliteStorage(Storage):
+    name = 'sqlite'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS constructions (
+            market_id INTEGER PRIMARY KEY, position INTEGER, system TEXT, station_name TEXT,
+            construction_progress REAL, construction_complete INTEGER, construction_failed INTEGER);
+        CREATE TABLE IF NOT EXISTS resources (
+            market_id INTEGER, commodity TEXT, position INTEGER, required INTEGER, provided INTEGER,
+            payment INTEGER, PRIMARY KEY (market_id, commodity));
+        CREATE INDEX IF NOT EXISTS resources_commodity ON resources (commodity);
+        CREATE TABLE IF NOT EXISTS deliveries (
+            id INTEGER PRIMARY KEY, market_id INTEGER, commodity TEXT, quantity INTEGER, provided INTEGER,
+            time TEXT);
+        CREATE INDEX IF NOT EXISTS deliveries_market_id ON deliveries (market_id, time);
+        CREATE INDEX IF NOT EXISTS deliveries_commodity ON deliveries (commodity, time);
+        CREATE INDEX IF NOT EXISTS deliveries_time ON deliveries (time);
+        CREATE TABLE IF NOT EXISTS carrier (id INTEGER PRIMARY KEY CHECK (id = 1), data TEXT);
+    """
+
+    def __init__(self, save_dir: str) -> None:
+        super().__init__(save_dir)
+        self.filePath = path.join(save_dir, "colonization.db")
+        self._pending: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.filePath, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    @property
+    def key(self) -> str:
+        return self.filePath
+
+    @property
+    def carrier_key(self) -> str:
+        return self.filePath + "#carrier"
+
+    def load(self) -> ConstructionRegistry:
+        with self._lock:
+            migrated = self._db.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+            updated = self._db.execute("SELECT value FROM meta WHERE key = 'updated'").fetchone()
+        if not migrated:
+            return self._migrate()
+        self.baseline = float(updated[0]) if updated else None
+        registry = ConstructionRegistry()
+        with self._lock:
+            resources: dict[int, dict[str, Any]] = {}
+            for row in self._db.execute("SELECT market_id, commodity, required, provided, payment FROM resources "
+                                        "ORDER BY market_id, position"):
+                resources.setdefault(row[0], {})[row[1]] = {
+                    'commodity': row[1], 'required': row[2], 'provided': row[3], 'payment': row[4]}
+            rows = self._db.execute("SELECT market_id, system, station_name, construction_progress, "
+                                    "construction_complete, construction_failed FROM constructions "
+                                    "ORDER BY position").fetchall()
+        for market_id, system, station_name, progress, complete, failed in rows:
+            registry.add(Construction(system=system, station_name=station_name, market_id=market_id,
+                                      construction_progress=progress, construction_complete=bool(complete),
+                                      construction_failed=bool(failed), required=resources.get(market_id)))
+        return registry
+
+    def _migrate(self) -> ConstructionRegistry:
+        legacy = JsonStorage(self.saveDir)
+        registry = legacy.load()
+        carrier = legacy.load_carrier()
+        self.baseline = legacy.baseline
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._replace([c.to_dict() for c in registry])
+                if carrier is not None:
+                    self._save_carrier(carrier)
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)",
+                                 (str(time.time()),))
+                if self.baseline is not None:
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated', ?)",
+                                     (str(self.baseline),))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if len(registry):
+            logger.info("Migrated %d constructions from JSON files to %s", len(registry), self.filePath)
+        return registry
+
+    def record(self, record: dict[str, Any]) -> None:
+        construction = record.get('construction')
+        if isinstance(construction, Construction):
+            record = {**record, 'construction': construction.to_dict()}
+        with self._lock:
+            self._pending.append(record)
+
+    def take(self, registry: ConstructionRegistry, snapshot: bool) -> Batch:
+        with self._lock:
+            records = self._pending
+            self._pending = []
+        return records, [c.to_dict() for c in registry] if snapshot else None
+
+    def write(self, batch: Batch) -> None:
+        records, snapshot = batch
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if snapshot is not None:
+                    self._replace(snapshot)
+                for record in records:
+                    self._apply(record, snapshot is None)
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated', ?)",
+                                 (str(time.time()),))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def deliveries(self, market_id: int | None = None, since: str | None = None) -> list[tuple[Any, ...]]:
+        query = "SELECT market_id, commodity, quantity, provided, time FROM deliveries WHERE 1 = 1"
+        args: list[Any] = []
+        if market_id is not None:
+            query += " AND market_id = ?"
+            args.append(market_id)
+        if since is not None:
+            query += " AND time >= ?"
+            args.append(since)
+        with self._lock:
+            return self._db.execute(query + " ORDER BY time, id", args).fetchall()
+
+    def load_carrier(self) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM carrier WHERE id = 1").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_carrier(self, data: dict[str, Any]) -> None:
+        with self._lock:
+            self._save_carrier(data)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _save_carrier(self, data: dict[str, Any]) -> None:
+        self._db.execute("INSERT INTO carrier (id, data) VALUES (1, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+                         (json.dumps(data, ensure_ascii=False, sort_keys=True),))
+
+    def _apply(self, record: dict[str, Any], update: bool) -> None:
+        op = record.get('op')
+        if op in ('track', 'depot'):
+            if update:
+                self._upsert(record['construction'])
+        elif op == 'deliver':
+            if update:
+                self._db.execute("UPDATE resources SET provided = ? WHERE market_id = ? AND commodity = ?",
+                                 (record['provided'], record['market_id'], record['commodity']))
+            if record.get('quantity'):
+                self._db.execute("INSERT INTO deliveries (market_id, commodity, quantity, provided, time) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 (record['market_id'], record['commodity'], record['quantity'], record['provided'],
+                                  record.get('time')))
+        elif op == 'remove':
+            if update:
+                self._db.execute("DELETE FROM resources WHERE market_id = ?", (record['market_id'],))
+                self._db.execute("DELETE FROM constructions WHERE market_id = ?", (record['market_id'],))
+        else:
+            logger.warning("Unknown storage record %s", op)
+
+    def _upsert(self, c: dict[str, Any]) -> None:
+        self._db.execute(
+            "INSERT INTO constructions (market_id, position, system, station_name, construction_progress, "
+            "construction_complete, construction_failed) "
+            "VALUES (?, (SELECT COALESCE(MAX(position), 0) + 1 FROM constructions), ?, ?, ?, ?, ?) "
+            "ON CONFLICT (market_id) DO UPDATE SET system = excluded.system, station_name = excluded.station_name, "
+            "construction_progress = excluded.construction_progress, "
+            "construction_complete = excluded.construction_complete, "
+            "construction_failed = excluded.construction_failed",
+            (c['market_id'], c['system'], c['station_name'], c['construction_progress'],
+             int(c['construction_complete']), int(c['construction_failed'])))
+        required = c['required']
+        for position, (commodity, r) in enumerate(required.items()):
+            self._db.execute(
+                "INSERT INTO resources (market_id, commodity, position, required, provided, payment) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (market_id, commodity) DO UPDATE SET "
+                "position = excluded.position, required = excluded.required, provided = excluded.provided, "
+                "payment = excluded.payment",
+                (c['market_id'], commodity, position, r['required'], r['provided'], r['payment']))
+        self._db.execute(f"DELETE FROM resources WHERE market_id = ? AND commodity NOT IN "
+                         f"({', '.join('?' * len(required))})", (c['market_id'], *required))
+
+    def _replace(self, constructions: list[dict[str, Any]]) -> None:
+        self._db.execute("DELETE FROM resources")
+        self._db.execute("DELETE FROM constructions")
+        for c in constructions:
+            self._upsert(c)
+
+
+def open_storage(save_dir: str, backend: str, delta_log: bool = True) -> Storage:
+    if backend == SqliteStorage.name:
+        try:
+            return SqliteStorage(save_dir)
+        except sqlite3.Error:
+            logger.exception("Cannot open SQLite storage, falling back to JSON files")
+    return JsonStorage(save_dir, delta_log)
@@ -0,0 +1,124 @@
+import math
+import time
+from array import array
+from typing import Hashable, Iterator, NamedTuple
+
+
+class Estimate(NamedTuple):
+    rate: float
+    remaining: int
+    eta: float | None
+    bottlenecks: list[str]
+
+
+class DeliveryRing:
+    __slots__ = ('times', 'commodities', 'tons', 'head', 'count')
+    SIZE = 64
+
+    def __init__(self, size: int = SIZE) -> None:
+        self.times = array('d', bytes(8 * size))
+        self.commodities: list[str | None] = [None] * size
+        self.tons = array('q', bytes(8 * size))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, when: float, commodity: str, tons: int) -> None:
+        i = self.head
+        self.times[i] = when
+        self.commodities[i] = commodity
+        self.tons[i] = tons
+        self.head = (i + 1) % len(self.tons)
+        if self.count < len(self.tons):
+            self.count += 1
+
+    def entries(self) -> Iterator[tuple[float, str, int]]:
+        size = len(self.tons)
+        start = (self.head - self.count) % size
+        for n in range(self.count):
+            i = (start + n) % size
+            yield self.times[i], self.commodities[i], self.tons[i]
+
+
+class DeliveryTelemetry:
+    SIZE = DeliveryRing.SIZE
+    WINDOW = 6 * 3600.0
+    MIN_SPAN = 15 * 60.0
+    BOTTLENECKS = 3
+
+    def __init__(self, size: int = SIZE, window: float = WINDOW) -> None:
+        self.size = size
+        self.window = window
+        self._rings: dict[Hashable, DeliveryRing] = {}
+        self._started: dict[Hashable, float] = {}
+        self._observed: dict[Hashable, float] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rings
+
+    def record(self, key: Hashable, commodity: str, tons: int, when: float | None = None) -> None:
+        if tons <= 0:
+            return
+        if when is None:
+            when = time.time()
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = DeliveryRing(self.size)
+        ring.add(when, commodity, tons)
+        self._start(key, when)
+
+    def observe(self, key: Hashable, delivered: dict[str, int], when: float | None = None) -> None:
+        if when is None:
+            when = time.time()
+        previous = self._observed.get(key)
+        self._observed[key] = when
+        self._start(key, when)
+        # progress since an unknown or stale observation cannot be placed in the window
+        if previous is None or when - previous > self.window:
+            return
+        for commodity, tons in delivered.items():
+            self.record(key, commodity, tons, when)
+
+    def remove(self, key: Hashable) -> None:
+        self._rings.pop(key, None)
+        self._started.pop(key, None)
+        self._observed.pop(key, None)
+
+    def clear(self) -> None:
+        self._rings.clear()
+        self._started.clear()
+        self._observed.clear()
+
+    def _start(self, key: Hashable, when: float) -> None:
+        started = self._started.get(key)
+        if started is None or when < started:
+            self._started[key] = when
+
+    def rates(self, key: Hashable = None, now: float | None = None) -> tuple[float, dict[str, float]]:
+        if now is None:
+            now = time.time()
+        rings = self._rings.values() if key is None else [self._rings[key]] if key in self._rings else []
+        since = now - self.window
+        total = 0
+        by_commodity: dict[str, int] = {}
+        for ring in rings:
+            for when, commodity, tons in ring.entries():
+                if when < since:
+                    continue
+                total += tons
+                by_commodity[commodity] = by_commodity.get(commodity, 0) + tons
+        if not total:
+            return 0.0, {}
+        started = min(self._started.values()) if key is None else self._started[key]
+        hours = max(min(self.window, now - started), self.MIN_SPAN) / 3600
+        return total / hours, {commodity: tons / hours for commodity, tons in by_commodity.items()}
+
+    def estimate(self, needs: dict[str, int], key: Hashable = None, now: float | None = None) -> Estimate:
+        rate, rates = self.rates(key, now)
+        remaining = sum(n for n in needs.values() if n > 0)
+        eta = remaining / rate * 3600 if rate > 0 else None
+        slowest = sorted(((n / rates[c] if rates.get(c) else math.inf, n, c) for c, n in needs.items() if n > 0),
+                         reverse=True)
+        return Estimate(rate, remaining, eta, [c for _, _, c in slowest[:self.BOTTLENECKS]])
@@ -1,5 +1,4 @@
 import tkinter as tk
-from config import config
 from os import path
 from functools import partial
 from enum import Enum
@@ -7,9 +6,13 @@ from typing import Any, Callable, Optional
 
 from theme import theme
 from collections import deque
+from EDMCLogging import get_main_logger
 
-from colonization.config import Config
+from colonization.config import settings
 from .data import Commodity, TableEntry, ptl
+from .metrics import metrics
+
+logger = get_main_logger()
 
 class SortingMode(Enum):
     MARKET = 0
@@ -31,19 +34,30 @@ class CollapseMode(Enum):
         return self != CollapseMode.EXPANDED
 
 class CommodityCategory:
+    __slots__ = ('symbol', 'rows', 'collapsed', '_unload', '_buy')
+
     def __init__(self, symbol:str, mode:CollapseMode = CollapseMode.EXPANDED):
         self.symbol = symbol.strip() if symbol else ''
         self.rows: list[TableEntry|CommodityCategory] = []
         self.collapsed: CollapseMode = mode
+        self._unload = 0
+        self._buy = 0
+
+    def add(self, row: 'TableEntry|CommodityCategory') -> None:
+        self.rows.append(row)
+        self._unload += row.unload()
+        self._buy += row.buy()
 
     def unload(self):
-        return sum([i.unload() for i in self.rows])
+        return self._unload
 
     def buy(self):
-        return sum([i.buy() for i in self.rows])
+        return self._buy
 
     def clear(self):
         self.rows = []
+        self._unload = 0
+        self._buy = 0
 
 class MainUi:
     ROWS = 20
@@ -53,17 +67,20 @@ class MainUi:
     def __init__(self) -> None:
         self.frame: Optional[tk.Frame] = None
         self.row = 0
-        self.icons = {
-            'left_arrow': tk.PhotoImage(file=path.join(self.iconDir, "left_arrow.gif")),
-            'right_arrow': tk.PhotoImage(file=path.join(self.iconDir, "right_arrow.gif")),
-            'view_open': tk.PhotoImage(file=path.join(self.iconDir, "view_open.gif")),
-            'view_close': tk.PhotoImage(file=path.join(self.iconDir, "view_close.gif"))
-        }
-        self.rows: Optional[list] = None
+        self._icons: dict[str, tk.PhotoImage] | None = None
+        self.rows: list[dict[str, tk.Label]] = []
+        self._render_cache: list[dict[str, dict[str, Any]]] = []
+        self.tk_ops: int = 0
+        self._view_key: tuple | None = None
+        self._view_list: list[TableEntry|CommodityCategory] = []
+        self._view_table: list[TableEntry] = []
+        self._view_total: bool = False
+        self.view_builds: int = 0
         self.subscribers: dict[str, Callable[[tk.Event | None], None]] = {}
         self.title: Optional[tk.Label] = None
         self.station: Optional[tk.Label] = None
         self.total_label: Optional[tk.Label] = None
+        self.rate_label: Optional[tk.Label] = None
         self.track_btn: Optional[tk.Button] = None
         self.prev_btn: Optional[tk.Label] = None
         self.next_btn: Optional[tk.Label] = None
@@ -74,9 +91,20 @@ class MainUi:
         self.top_rows: int = 0
         self.bottom_rows: int = 0
         self.categories: dict[str,CommodityCategory] = {}
-        self.ROWS = config.get_int("colonization.Rows", default=25)
-        self.CATEGORIES = config.get_bool("colonization.Categories", default=True)
-        self.COLLAPSABLE = config.get_bool("colonization.Collapsable", default=True)
+        self.ROWS = settings.rows
+        self.CATEGORIES = settings.categories
+        self.COLLAPSABLE = settings.collapsable
+
+    @property
+    def icons(self) -> dict[str, tk.PhotoImage]:
+        if self._icons is None:
+            self._icons = {
+                'left_arrow': tk.PhotoImage(file=path.join(self.iconDir, "left_arrow.gif")),
+                'right_arrow': tk.PhotoImage(file=path.join(self.iconDir, "right_arrow.gif")),
+                'view_open': tk.PhotoImage(file=path.join(self.iconDir, "view_open.gif")),
+                'view_close': tk.PhotoImage(file=path.join(self.iconDir, "view_close.gif"))
+            }
+        return self._icons
 
     def next_row(self) -> int:
         row = self.row
@@ -125,6 +153,10 @@ class MainUi:
         self.total_label = tk.Label(self.frame, text=ptl("nothing to deliver"), justify=tk.CENTER)
         self.total_label.grid_configure(row=self.next_row(), column=0, sticky=tk.EW)
 
+        self.rate_label = tk.Label(self.frame, text="", justify=tk.CENTER)
+        self.rate_label.grid_configure(row=self.next_row(), column=0, sticky=tk.EW)
+        self.rate_label.grid_remove()
+
         self.track_btn = tk.Button(self.frame, text=ptl("Track this construction"), command=partial(self.event, "track", None))
         self.track_btn.grid(row=self.next_row(), column=0, sticky=tk.EW, columnspan=5)
 
@@ -138,27 +170,40 @@ class MainUi:
         tk.Label(self.table_frame, text=ptl("Carrier")).grid(row=0, column=3, sticky=tk.E)
         tk.Label(self.table_frame, text=ptl("Cargo")).grid(row=0, column=4, sticky=tk.E)
 
-        fontDefault = ("Tahoma", 9, "normal")
-        fontMono = ("Tahoma", 9, "normal")
-
+        # commodity rows are created on first paint by _ensure_rows
         self.rows = []
-        for i in range(self.ROWS):
-            self.table_frame.grid_rowconfigure(i+1, pad=0)
-            labels = {
-                'name': tk.Label(self.table_frame, anchor=tk.W, font=fontDefault, justify=tk.LEFT),
-                'buy': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
-                'demand': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
-                'cargo': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
-                'carrier': tk.Label(self.table_frame, anchor=tk.E, font=fontMono)
-            }
-            labels['name'].grid_configure(sticky=tk.W)
-            for label in labels.values():
-                label.grid_remove()
-            self.rows.append(labels)
+        self._render_cache = []
 
         theme.update(self.table_frame)
         theme.update(self.frame)
 
+    def _ensure_rows(self, count: int) -> None:
+        if len(self.rows) >= count:
+            return
+        while len(self.rows) < count:
+            labels = self._create_row(len(self.rows))
+            self.rows.append(labels)
+            self._render_cache.append({column: {'grid': None} for column in labels})
+            # theming the whole table would reset colours the render cache still remembers
+            for label in labels.values():
+                theme.update(label)
+
+    def _create_row(self, i: int) -> dict[str, tk.Label]:
+        fontDefault = ("Tahoma", 9, "normal")
+        fontMono = ("Tahoma", 9, "normal")
+        self.table_frame.grid_rowconfigure(i+1, pad=0)
+        labels = {
+            'name': tk.Label(self.table_frame, anchor=tk.W, font=fontDefault, justify=tk.LEFT),
+            'buy': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
+            'demand': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
+            'cargo': tk.Label(self.table_frame, anchor=tk.E, font=fontMono),
+            'carrier': tk.Label(self.table_frame, anchor=tk.E, font=fontMono)
+        }
+        labels['name'].grid_configure(sticky=tk.W)
+        for label in labels.values():
+            label.grid_remove()
+        return labels
+
     def event(self, event: str, tk_event: tk.Event | None) -> None:
         if event in self.subscribers:
             self.subscribers[event](tk_event)
@@ -192,7 +237,7 @@ class MainUi:
             cc.collapsed = CollapseMode.EXPANDED
         else:
             cc.collapsed = CollapseMode.COLLAPSED
-        self.event('update', None)
+        self.set_table(self._view_table, None, self._view_total)
 
     def _incr_top_rows(self, event, rows: int):
         rows = self.bottom_rows
@@ -202,7 +247,7 @@ class MainUi:
         if rows > page_size:
             rows = page_size
         self.top_rows += rows
-        self.event('update', None)
+        self._render_view()
 
     def _decr_top_rows(self, event, rows: int):
         rows = self.top_rows
@@ -212,85 +257,116 @@ class MainUi:
         self.top_rows -= rows
         if self.top_rows <= 1:
             self.top_rows = 0
-        self.event('update', None)
+        self._render_view()
+
+    def _configure(self, row: int, column: str, **options: Any) -> None:
+        cache = self._render_cache[row][column]
+        changed = {k: v for k, v in options.items() if cache.get(k) != v}
+        if changed:
+            self.rows[row][column].configure(**changed)
+            cache.update(changed)
+            self.tk_ops += 1
+
+    def _grid(self, row: int, column: str, grid_column: int | None) -> None:
+        cache = self._render_cache[row][column]
+        if cache.get('grid') == grid_column:
+            return
+        if grid_column is None:
+            self.rows[row][column].grid_remove()
+        else:
+            self.rows[row][column].grid(row=row+1, column=grid_column)
+        cache['grid'] = grid_column
+        self.tk_ops += 1
+
+    def _bind(self, row: int, key: tuple | None, callback: Callable[[tk.Event], None] | None = None) -> None:
+        cache = self._render_cache[row]['name']
+        if cache.get('bind') == key:
+            return
+        if callback:
+            self.rows[row]['name'].bind("<Button-1>", callback)
+        else:
+            self.rows[row]['name'].unbind("<Button-1>")
+        cache['bind'] = key
+        self.tk_ops += 1
 
     def _show_category(self, row: int, cc: CommodityCategory):
         if row >= self.ROWS:
             row = self.ROWS-1
         if cc.collapsed == CollapseMode.LEADING:
-            self.rows[row]['name']['text'] = '▲ ({}) {}'.format(len(cc.rows), ptl(cc.symbol))
-            self.rows[row]['name'].bind("<Button-1>", lambda e,cnt=len(cc.rows): self._decr_top_rows(e,cnt))
+            self._configure(row, 'name', text='▲ ({}) {}'.format(len(cc.rows), ptl(cc.symbol)))
+            self._bind(row, ('decr', len(cc.rows)), lambda e,cnt=len(cc.rows): self._decr_top_rows(e,cnt))
         elif cc.collapsed == CollapseMode.TRAILING:
-            self.rows[row]['name']['text'] = '▼ ({}) {}'.format(len(cc.rows), ptl(cc.symbol))
-            self.rows[row]['name'].bind("<Button-1>", lambda e,cnt=len(cc.rows): self._incr_top_rows(e,cnt))
+            self._configure(row, 'name', text='▼ ({}) {}'.format(len(cc.rows), ptl(cc.symbol)))
+            self._bind(row, ('incr', len(cc.rows)), lambda e,cnt=len(cc.rows): self._incr_top_rows(e,cnt))
         elif self.COLLAPSABLE:
-            self.rows[row]['name'].bind("<Button-1>", lambda e,category=cc.symbol: self._toggle_category(e,category))
+            self._bind(row, ('toggle', cc.symbol), lambda e,category=cc.symbol: self._toggle_category(e,category))
             if cc.collapsed:
-                self.rows[row]['name']['text'] = '▶ ({}) {}'.format(len(cc.rows), ptl(cc.symbol))
+                self._configure(row, 'name', text='▶ ({}) {}'.format(len(cc.rows), ptl(cc.symbol)))
             else:
-                self.rows[row]['name']['text'] = '▽ ' + ptl(cc.symbol)
+                self._configure(row, 'name', text='▽ ' + ptl(cc.symbol))
         else:
-            self.rows[row]['name']['text'] = '▽ ' + ptl(cc.symbol)
+            self._bind(row, None)
+            self._configure(row, 'name', text='▽ ' + ptl(cc.symbol))
 
         fg_color = theme.current['highlight'] if theme.current else 'blue'
-        self.rows[row]['name']['fg'] = fg_color
-        self.rows[row]['name'].grid(row=row+1, column=0)
-        self.rows[row]['cargo'].grid_remove()
-        self.rows[row]['carrier'].grid_remove()
-        self.rows[row]['name'].grid(row=row+1, column=0)
+        self._configure(row, 'name', fg=fg_color)
+        self._grid(row, 'name', 0)
+        self._grid(row, 'cargo', None)
+        self._grid(row, 'carrier', None)
         if cc.collapsed != CollapseMode.EXPANDED:
-            self.rows[row]['demand']['text'] = '{:8,d}'.format(cc.unload())
-            self.rows[row]['buy']['text'] = '{:8,d}'.format(cc.buy())
-            self.rows[row]['demand']['fg'] = fg_color
-            self.rows[row]['demand'].grid(row=row+1, column=1)
-            self.rows[row]['buy']['fg'] = fg_color
-            self.rows[row]['buy'].grid(row=row+1, column=4)
+            self._configure(row, 'demand', text='{:8,d}'.format(cc.unload()), fg=fg_color)
+            self._configure(row, 'buy', text='{:8,d}'.format(cc.buy()), fg=fg_color)
+            self._grid(row, 'demand', 1)
+            self._grid(row, 'buy', 4)
         else:
-            self.rows[row]['demand'].grid_remove()
-            self.rows[row]['buy'].grid_remove()
+            self._grid(row, 'demand', None)
+            self._grid(row, 'buy', None)
 
     def _show_commodity(self, row: int, i:TableEntry):
         c: Commodity = i.commodity
+        buy = i.buy()
 
-        self.rows[row]['name']['text'] = c.name
-        self.rows[row]['demand']['text'] = '{:8,d}'.format(i.unload())
-        self.rows[row]['cargo']['text'] = '{:8,d}'.format(i.cargo)
-        self.rows[row]['carrier']['text'] = '{:8,d}'.format(i.carrier)
-        self.rows[row]['buy']['text'] = '{:8,d}'.format(i.buy())
-
-        self.rows[row]['name'].grid(row=row+1, column=0)
-        self.rows[row]['buy'].grid(row=row + 1, column=1)
-        self.rows[row]['demand'].grid(row=row+1, column=2)
-        self.rows[row]['cargo'].grid(row=row+1, column=3)
-        self.rows[row]['carrier'].grid(row=row+1, column=4)
-
-        if i.buy() <= 0:
-            self.rows[row]['name']['fg'] = 'green'
-            self.rows[row]['buy']['fg'] = 'green'
-            self.rows[row]['demand']['fg'] = 'green'
-            self.rows[row]['cargo']['fg'] = 'green'
-            self.rows[row]['carrier']['fg'] = 'green'
+        if buy <= 0:
+            name_color = fg_color = 'green'
         else:
             fg_color = theme.current['foreground'] if theme.current else 'black'
-            if i.available:
-                self.rows[row]['name']['fg'] = '#FFF'
-            else:
-                self.rows[row]['name']['fg'] = fg_color
-            self.rows[row]['buy']['fg'] = fg_color
-            self.rows[row]['demand']['fg'] = fg_color
-            self.rows[row]['cargo']['fg'] = fg_color
-            self.rows[row]['carrier']['fg'] = fg_color
-            self.rows[row]['buy']['fg'] = fg_color
+            name_color = '#FFF' if i.available else fg_color
+
+        self._bind(row, None)
+        self._configure(row, 'name', text=c.name, fg=name_color)
+        self._configure(row, 'buy', text='{:8,d}'.format(buy), fg=fg_color)
+        self._configure(row, 'demand', text='{:8,d}'.format(i.unload()), fg=fg_color)
+        self._configure(row, 'cargo', text='{:8,d}'.format(i.cargo), fg=fg_color)
+        self._configure(row, 'carrier', text='{:8,d}'.format(i.carrier), fg=fg_color)
+
+        self._grid(row, 'name', 0)
+        self._grid(row, 'buy', 1)
+        self._grid(row, 'demand', 2)
+        self._grid(row, 'cargo', 3)
+        self._grid(row, 'carrier', 4)
 
 
-    def set_table(self, table: list[TableEntry], docked, isTotal: bool):
-        if not self.rows:
+    def set_table(self, table: list[TableEntry] | Callable[[], list[TableEntry]], docked, isTotal: bool,
+                  version: int | None = None):
+        if self.table_frame is None:
             return
 
         if self.view_mode == ViewMode.NONE:
             self.table_frame.grid_remove()
             return
 
+        collapsed = tuple(symbol for symbol, cc in self.categories.items() if cc.collapsed)
+        key = (version, isTotal, self.sorting_mode, self.view_mode, collapsed,
+               self.CATEGORIES, self.COLLAPSABLE, self.ROWS)
+        if version is None or key != self._view_key:
+            self._view_table = table() if callable(table) else table
+            self._view_total = isTotal
+            self._view_list = self._build_view(self._view_table, isTotal)
+            self._view_key = key if version is not None else None
+            self.view_builds += 1
+        self._render_view()
+
+    def _build_view(self, table: list[TableEntry], isTotal: bool) -> list[TableEntry|CommodityCategory]:
         # sort
         if self.sorting_mode == SortingMode.MARKET:
             table.sort(key=lambda c: c.commodity.market_ord)
@@ -300,7 +376,7 @@ class MainUi:
             table.sort(key=lambda c: c.commodity.name)
 
         # prepare a list of rows (display_list)
-        display_list: deque[TableEntry|CommodityCategory] = deque()
+        display_list: list[TableEntry|CommodityCategory] = []
         show_categories = self.CATEGORIES and self.sorting_mode == SortingMode.MARKET
         if show_categories:
             for cc in self.categories.values():
@@ -317,14 +393,20 @@ class MainUi:
                         self.categories[cc.symbol] = cc
                     display_list.append(cc)
             if self.COLLAPSABLE and cc and cc.collapsed:
-                cc.rows.append(i)
+                cc.add(i)
             else:
                 display_list.append(i)
+        return display_list
+
+    def _render_view(self) -> None:
+        if self.table_frame is None:
+            return
+        display_list: deque[TableEntry|CommodityCategory] = deque(self._view_list)
         # collapse first rows into 'others'
         if self.top_rows > 0 and len(display_list) > self.ROWS:
             cc_others = CommodityCategory("Others Commodities", CollapseMode.LEADING)
             while len(cc_others.rows) < self.top_rows and len(display_list) > self.ROWS-1:
-                cc_others.rows.append(display_list.popleft())
+                cc_others.add(display_list.popleft())
             display_list.appendleft(cc_others)
             self.top_rows = len(cc_others.rows)
         # collapse last rows into 'others'
@@ -332,10 +414,12 @@ class MainUi:
         if len(display_list) > self.ROWS:
             cc_others = CommodityCategory("Others Commodities", CollapseMode.TRAILING)
             while len(display_list) > self.ROWS-1:
-                cc_others.rows.append(display_list.pop())
+                cc_others.add(display_list.pop())
             display_list.append(cc_others)
             self.bottom_rows = len(cc_others.rows)
 
+        self.tk_ops = 0
+        self._ensure_rows(len(display_list))
         row = 0
         for i in display_list:
             if isinstance(i, TableEntry):
@@ -344,19 +428,21 @@ class MainUi:
                 self._show_category(row, i)
             row += 1
 
-        for i in range(row, self.ROWS):
-            for r in self.rows[i].values():
-                r.grid_remove()
+        for i in range(row, len(self.rows)):
+            for column in self.rows[i]:
+                self._grid(i, column, None)
 
         if row == 0:
             self.table_frame.grid_remove()
         else:
             self.table_frame.grid()
+        if metrics.enabled:
+            logger.debug("set_table issued %d Tk operations", self.tk_ops)
 
 
     def set_station(self, value: str | None, color: str | None = None) -> None:
         if self.station and theme.current:
-            if Config.SHOW_STATION_NAME.get():
+            if settings.show_station_name:
                 self.station['text'] = str(value)
                 if color:
                     self.station['fg'] = color
@@ -369,14 +455,17 @@ class MainUi:
             else:
                 self.station.grid_remove()
 
-    def set_total(self, cargo:int, maxcargo:int, color:str | None = None) -> None:
+    def set_total(self, cargo:int, maxcargo:int, color:str | None = None, trips:int | None = None) -> None:
         if self.total_label and theme.current:
-            if Config.SHOW_TOTALS.get():
-                if maxcargo > 0:
-                    flight = float(cargo)/float(maxcargo)
+            if settings.show_totals:
+                if trips is not None:
+                    self.total_label['text'] = f"Remaining {trips} flights at {maxcargo} tons each, total {str(cargo)} t"
                 else:
-                    flight = 0.0
-                self.total_label['text'] = f"Remaining {flight:.1f} flights at {maxcargo} tons each, total {str(cargo)} t"
+                    if maxcargo > 0:
+                        flight = float(cargo)/float(maxcargo)
+                    else:
+                        flight = 0.0
+                    self.total_label['text'] = f"Remaining {flight:.1f} flights at {maxcargo} tons each, total {str(cargo)} t"
                 if color:
                     self.total_label['fg'] = color
                 else:
@@ -384,3 +473,18 @@ class MainUi:
                 self.total_label.grid()
             else:
                 self.total_label.grid_remove()
+
+    def set_rate(self, rate:float, eta:float | None, bottlenecks:list[str]) -> None:
+        if self.rate_label and theme.current:
+            if rate > 0:
+                text = f"Delivering {rate:.0f} t/h"
+                if eta is not None:
+                    hours, minutes = divmod(int(eta) // 60, 60)
+                    text += f", ETA {hours}h {minutes:02d}m"
+                if bottlenecks:
+                    text += f", slowest: {', '.join(bottlenecks)}"
+                self.rate_label['text'] = text
+                self.rate_label['fg'] = theme.current['foreground']
+                self.rate_label.grid()
+            else:
+                self.rate_label.grid_remove()
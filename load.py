@@ -1,5 +1,5 @@
 import sys
-from colonization.config import Config
+from colonization.config import settings
 
 from colonization.colonization import ColonizationPlugin
 from colonization.ui import MainUi
@@ -14,6 +14,10 @@ def plugin_start3(plugin_dir):
     return "ColonizationPlugin"
 
 
+def plugin_stop() -> None:
+    this.plugin.plugin_stop()
+
+
 def cmdr_data(data, is_beta) -> None:
     this.plugin.cmdr_data(data, is_beta)
 
@@ -32,7 +36,7 @@ def prefs_changed(cmdr, is_beta):
 
 
 def capi_fleetcarrier(data):
-    if Config.IGNORE_FC_UPDATE.get():
+    if settings.ignore_fc_update:
         return
     this.plugin.capi_fleetcarrier(data)
 
@@ -41,5 +45,5 @@ def plugin_app(parent):
     this.ui = MainUi()
     this.plugin.setup_ui(this.ui)
     ui = this.ui.plugin_app(parent)
-    this.plugin.update_display()
+    this.plugin.schedule_startup()
     return ui
@@ -0,0 +1,224 @@
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from os import path
+from typing import Any, Callable
+
+from . import stubs
+
+stubs.install()
+
+from colonization.catalog import CommodityCatalog  # noqa: E402
+from colonization.colonization import ColonizationPlugin  # noqa: E402
+from colonization.construction import ConstructionResource  # noqa: E402
+from colonization.planner import HaulPlanner  # noqa: E402
+from colonization.storage import open_storage  # noqa: E402
+
+from .headless import HeadlessUi  # noqa: E402
+
+PLUGIN_DIR = path.abspath(path.join(path.dirname(__file__), "../.."))
+CONSTRUCTION_COUNTS = (1, 10, 100)
+PLANNER_SITES = (1, 10, 50, 100, 200)
+STORAGE_BACKENDS = ('json', 'sqlite')
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+def make_plugin(constructions: int, save_dir: str | None = None) -> ColonizationPlugin:
+    rnd = random.Random(constructions)
+    plugin = ColonizationPlugin()
+    plugin.pluginDir = PLUGIN_DIR
+    plugin.catalog = CommodityCatalog(PLUGIN_DIR, tempfile.gettempdir())
+    plugin._load_commodity_catalog()
+    plugin.saveDir = save_dir
+    symbols = sorted(plugin.commodityMap)
+    for market_id in range(1, constructions + 1):
+        required = {}
+        for symbol in rnd.sample(symbols, 20):
+            amount = rnd.randint(100, 20000)
+            required[symbol] = ConstructionResource(symbol, amount, rnd.randint(0, amount), 1000)
+        plugin.colonisation_construction_depot("SYS", f"Orbital Construction Site: Site {market_id}", market_id,
+                                               0.1, False, False, required)
+        plugin.track_station(None)
+    plugin.dockedConstruction = False
+    plugin.currentConstruction = None
+    plugin.currentConstructionId = -1
+    plugin.maxcargo = 784
+    return plugin
+
+
+def journal_events(plugin: ColonizationPlugin, count: int) -> list[dict[str, Any]]:
+    rnd = random.Random(count)
+    symbols = sorted(plugin.commodityMap)
+    market_ids = [c.market_id for c in plugin.constructions]
+    events: list[dict[str, Any]] = []
+    while len(events) < count:
+        symbol = rnd.choice(symbols)
+        market_id = rnd.choice(market_ids)
+        events.append({'event': 'Music', 'MusicTrack': 'Starport'})
+        events.append({'event': 'MarketBuy', 'Type': symbol, 'Count': 100})
+        events.append({'event': 'Cargo', 'Count': 100})
+        events.append({'event': 'CargoTransfer', 'Transfers': [
+            {'Type': rnd.choice(symbols), 'Count': 10, 'Direction': rnd.choice(('toship', 'tocarrier'))}
+            for _ in range(5)]})
+        events.append({'event': 'ReceiveText', 'Message': 'o7'})
+        events.append({'event': 'ColonisationContribution', 'MarketID': market_id,
+                       'Contributions': [{'Name': f'${symbol}_name;', 'Amount': 100}]})
+        events.append({'event': 'ColonisationConstructionDepot', 'MarketID': market_id, 'ConstructionProgress': 0.5,
+                       'ConstructionComplete': False, 'ConstructionFailed': False,
+                       'ResourcesRequired': [{'Name': f'${s}_name;', 'RequiredAmount': 1000, 'ProvidedAmount': 10,
+                                              'Payment': 1000} for s in symbols[:30]]})
+    return events[:count]
+
+
+def bench_journal(constructions: int, count: int) -> dict[str, Any]:
+    plugin = make_plugin(constructions)
+    events = journal_events(plugin, count)
+    state = {'StationName': 'Site', 'SystemName': 'SYS', 'Cargo': {'steel': 100}}
+    start = time.perf_counter()
+    for entry in events:
+        plugin.journal_entry("cmdr", False, "SYS", "Site", entry, state)
+    elapsed = time.perf_counter() - start
+    return {'events': count, 'seconds': elapsed, 'events_per_sec': count / elapsed}
+
+
+def bench_update_display(constructions: int, repeat: int) -> dict[str, Any]:
+    plugin = make_plugin(constructions)
+    plugin.setup_ui(HeadlessUi())
+    result: dict[str, Any] = {'total': measure(plugin.update_display, repeat)}
+
+    def dirty_update() -> None:
+        plugin.version += 1
+        plugin.update_display()
+    result['total_dirty'] = measure(dirty_update, repeat)
+    plugin.currentConstruction = plugin.constructions.first()
+    plugin.currentConstructionId = plugin.currentConstruction.market_id if plugin.currentConstruction else -1
+    result['single'] = measure(dirty_update, repeat)
+    return result
+
+
+def bench_set_table(constructions: int, repeat: int) -> dict[str, Any]:
+    plugin = make_plugin(constructions)
+    ui = HeadlessUi()
+    table = plugin.get_table()
+    ui.set_table(table, None, True)
+    result: dict[str, Any] = {'rebuild': measure(lambda: ui.set_table(table, None, True), repeat)}
+    result['cached'] = measure(lambda: ui.set_table(table, None, True, 1), repeat)
+    result['tk_ops_last'] = ui.tk_ops
+    return result
+
+
+def bench_storage(constructions: int, repeat: int, backend: str) -> dict[str, Any]:
+    save_dir = tempfile.mkdtemp()
+    try:
+        plugin = make_plugin(constructions, save_dir)
+        plugin.storage = open_storage(save_dir, backend)
+        plugin.storage.load()
+
+        def snapshot() -> None:
+            plugin._snapshot_requested = True
+            plugin._write_constructions()
+
+        result: dict[str, Any] = {'save': measure(snapshot, repeat)}
+        construction = next(iter(plugin.constructions))
+        commodity = next(iter(construction.required))
+
+        def deliver() -> None:
+            plugin._record({'op': 'deliver', 'market_id': construction.market_id, 'commodity': commodity,
+                            'provided': construction.required[commodity].provided, 'quantity': 1,
+                            'time': "2025-01-01T00:00:00Z"})
+            plugin._write_constructions()
+
+        result['record'] = measure(deliver, repeat)
+        result['load'] = measure(plugin.load, repeat)
+        plugin.storage.close()
+        return result
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+
+def bench_planner(sites: int, repeat: int) -> dict[str, Any]:
+    rnd = random.Random(sites)
+    symbols = [f"commodity{i}" for i in range(60)]
+    needs: dict[str, int] = {}
+    for _ in range(sites):
+        for symbol in rnd.sample(symbols, 20):
+            needs[symbol] = needs.get(symbol, 0) + rnd.randint(0, 20000)
+    carrier = {symbol: rnd.randint(0, 5000) for symbol in rnd.sample(symbols, 15)}
+    planner = HaulPlanner()
+    loads = planner.loads(needs, carrier, {})
+    plan = planner.solve(loads, 784)
+    return {'solve': measure(lambda: planner.solve(loads, 784), repeat),
+            'cached': measure(lambda: planner.plan(needs, carrier, {}, 784), repeat),
+            'loads': len(loads), 'trips': len(plan), 'lower_bound': plan.lowerBound, 'optimal': plan.optimal}
+
+
+def bench_catalog(repeat: int) -> dict[str, Any]:
+    save_dir = tempfile.mkdtemp()
+    try:
+        catalog = CommodityCatalog(PLUGIN_DIR, tempfile.gettempdir(), save_dir)
+        cold = CommodityCatalog(PLUGIN_DIR, tempfile.gettempdir())
+        catalog.load('en')
+        return {'compile': measure(lambda: cold.load('en'), repeat),
+                'cached': measure(lambda: catalog.load('en'), repeat)}
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmark",
+                                     description="Headless benchmarks for the colonisation plugin hot paths")
+    parser.add_argument('-o', '--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--quick', action='store_true', help="fewer repetitions")
+    args = parser.parse_args()
+    repeat = 20 if args.quick else 200
+    events = 2000 if args.quick else 20000
+
+    results: dict[str, Any] = {'catalog': bench_catalog(repeat)}
+    for n in CONSTRUCTION_COUNTS:
+        results[f'journal_entry/{n}'] = bench_journal(n, events)
+        results[f'update_display/{n}'] = bench_update_display(n, repeat)
+        results[f'set_table/{n}'] = bench_set_table(n, repeat)
+        for backend in STORAGE_BACKENDS:
+            results[f'storage/{backend}/{n}'] = bench_storage(n, max(5, repeat // 10), backend)
+    for n in PLANNER_SITES:
+        results[f'planner/{n}'] = bench_planner(n, repeat)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'results': results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
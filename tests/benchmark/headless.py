@@ -0,0 +1,47 @@
+from typing import Any
+
+from colonization.ui import MainUi
+
+
+class FakeWidget(dict):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.calls += 1
+        super().__setitem__(key, value)
+
+    def configure(self, **options: Any) -> None:
+        self.calls += 1
+        self.update(options)
+
+    def grid(self, **options: Any) -> None:
+        self.calls += 1
+
+    def grid_remove(self) -> None:
+        self.calls += 1
+
+    def bind(self, *args: Any) -> None:
+        self.calls += 1
+
+    def unbind(self, *args: Any) -> None:
+        self.calls += 1
+
+
+class HeadlessUi(MainUi):
+    def __init__(self, rows: int = 25) -> None:
+        super().__init__()
+        self.ROWS = rows
+        self.title = FakeWidget()
+        self.station = FakeWidget()
+        self.total_label = FakeWidget()
+        self.rate_label = FakeWidget()
+        self.track_btn = FakeWidget()
+        self.prev_btn = FakeWidget()
+        self.next_btn = FakeWidget()
+        self.view_btn = FakeWidget()
+        self.table_frame = FakeWidget()
+
+    def _create_row(self, i: int) -> dict[str, Any]:
+        return {column: FakeWidget() for column in ('name', 'buy', 'demand', 'cargo', 'carrier')}
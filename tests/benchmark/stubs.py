@@ -0,0 +1,45 @@
+import logging
+import sys
+import tempfile
+import types
+from pathlib import Path
+from typing import Any
+
+from ..conftest import Config
+
+logger = logging.getLogger("colonization.benchmark")
+
+
+def _config(settings: dict[str, Any], app_dir: Path) -> Config:
+    return Config(
+        app_dir_path=app_dir,
+        default_journal_dir=None,
+        get_int=lambda key, default=0: settings.get(key, default),
+        get_bool=lambda key, default=False: settings.get(key, default),
+        get_str=lambda key, default=None: settings.get(key, default),
+        get_list=lambda key, default=None: settings.get(key, default),
+        set=settings.__setitem__,
+    )
+
+
+def _module(name: str, **attrs: Any) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install(settings: dict[str, Any] | None = None) -> Config:
+    edmc_config = _config(settings if settings is not None else {}, Path(tempfile.mkdtemp()))
+    for module in (
+        _module('EDMCLogging', get_main_logger=lambda: logger),
+        _module('config', config=edmc_config),
+        _module('monitor', monitor=Config(
+            state={'StationName': None, 'SystemName': None, 'MarketID': None, 'Cargo': {}},
+            currentdir=None)),
+        _module('theme', theme=Config(current={'foreground': 'black', 'highlight': 'blue'},
+                                      update=lambda widget: None)),
+        _module('companion', CAPIData=dict, session=None, Session=Config(STATE_OK=0)),
+        _module('l10n', translations=Config(translate=lambda x, context=None: x)),
+    ):
+        sys.modules[module.__name__] = module
+    return edmc_config
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from ..colonization.backfill import JournalBackfill
+
+
+def _write_journal(file_path: Path, events: list[dict[str, Any]]) -> None:
+    with open(file_path, 'a', encoding='utf-8') as file:
+        for event in events:
+            file.write(json.dumps(event) + '\n')
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path: Path) -> None:
+    journal = tmp_path / "Journal.2025-04-01T100000.01.log"
+    _write_journal(journal, [
+        {'timestamp': '2025-04-01T10:00:00Z', 'event': 'Docked', 'StationName': 'Site', 'StarSystem': 'SYS', 'MarketID': 5},
+        {'timestamp': '2025-04-01T10:01:00Z', 'event': 'Music', 'MusicTrack': 'Starport'},
+        {'timestamp': '2025-04-01T10:02:00Z', 'event': 'ColonisationContribution', 'MarketID': 5, 'Contributions': []},
+    ])
+    backfill = JournalBackfill()
+    backfill.load(str(tmp_path), str(tmp_path / "backfill.json"))
+    replayed: list[tuple[str, Any]] = []
+
+    assert backfill.run(lambda entry, state: replayed.append((entry['event'], state['StationName']))) == 1
+    assert replayed == [('ColonisationContribution', 'Site')]
+
+    _write_journal(journal, [{'timestamp': '2025-04-01T10:03:00Z', 'event': 'MarketBuy', 'Type': 'steel', 'Count': 1}])
+    assert backfill.run(lambda entry, state: replayed.append((entry['event'], state['StationName']))) == 1
+    assert replayed[-1] == ('MarketBuy', 'Site')
+    assert backfill.offset == journal.stat().st_size
+
+
+def test_backfill_merges_overlapping_journals_in_order(tmp_path: Path) -> None:
+    for day in range(1, 8):
+        _write_journal(tmp_path / f"Journal.2025-04-0{day}T100000.01.log", [
+            {'timestamp': f'2025-04-0{day}T10:00:00Z', 'event': 'MarketBuy', 'Type': 'steel', 'Count': day},
+            {'timestamp': f'2025-04-0{day}T12:00:00Z', 'event': 'MarketBuy', 'Type': 'steel', 'Count': day},
+        ])
+    # a second game client running alongside the first one
+    _write_journal(tmp_path / "Journal.2025-04-03T110000.01.log", [
+        {'timestamp': '2025-04-03T11:00:00Z', 'event': 'MarketBuy', 'Type': 'steel', 'Count': 0},
+    ])
+    backfill = JournalBackfill()
+    backfill.load(str(tmp_path), str(tmp_path / "backfill.json"))
+    replayed: list[str] = []
+
+    assert backfill.run(lambda entry, state: replayed.append(entry['timestamp'])) == 15
+    assert replayed == sorted(replayed)
+    assert backfill.file == "Journal.2025-04-07T100000.01.log"
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from ..colonization.capi import CarrierFetch
+from ..colonization.colonization import ColonizationPlugin
+from ..colonization.fleetcarrier import FleetCarrier
+
+CARRIER = {'name': {'callsign': 'XZX-01Z'}, 'cargo': [{'commodity': 'Steel', 'qty': 500}]}
+
+
+class FakeCapi(ThreadingHTTPServer):
+    latency = 0.0
+    hits = 0
+
+
+class FakeCapiHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # pylint: disable=C0103
+        server: FakeCapi = self.server  # type: ignore
+        server.hits += 1
+        time.sleep(server.latency)
+        body = json.dumps(CARRIER).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def capi() -> Iterator[FakeCapi]:
+    server = FakeCapi(('127.0.0.1', 0), FakeCapiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server: FakeCapi) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/fleetcarrier"
+
+
+def _fetch(url: str, timeout: float) -> Any:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def test_concurrent_refreshes_are_deduplicated(capi: FakeCapi, tmp_path: Path) -> None:
+    capi.latency = 0.2
+    plugin = ColonizationPlugin()
+    plugin.carrier = FleetCarrier()
+    plugin.carrier.load(str(tmp_path / "fccargo.json"))
+    errors: list[Exception | None] = []
+
+    assert plugin.fetch_carrier(_url(capi), _fetch, errors.append)
+    assert not plugin.fetch_carrier(_url(capi), _fetch, errors.append)
+    plugin.carrierFetch.join(5)
+    plugin.poll_carrier_fetch()
+
+    assert capi.hits == 1
+    assert errors == [None]
+    assert plugin.carrier.callSign == 'XZX-01Z'
+    assert plugin.carrier.get('steel') == 500
+
+
+def test_slow_response_times_out_and_retries(capi: FakeCapi) -> None:
+    capi.latency = 0.5
+    fetch = CarrierFetch(timeout=0.1, retries=1, backoff=0)
+
+    fetch.request(_url(capi), _fetch)
+    fetch.join(5)
+
+    [(data, error)] = fetch.drain()
+    assert data is None
+    assert error is not None
+    assert capi.hits == 2
+
+
+def test_unchanged_sync_skips_redraw_but_saves_sync_time(tmp_path: Path) -> None:
+    plugin = ColonizationPlugin()
+    plugin.carrier = FleetCarrier()
+    plugin.carrier.load(str(tmp_path / "fccargo.json"))
+
+    plugin.capi_fleetcarrier(CARRIER)
+    version = plugin.version
+    (tmp_path / "fccargo.json").unlink()
+    plugin.carrier.lastSync = "2025-01-01T00:00:00+00:00"
+    plugin.capi_fleetcarrier(CARRIER)
+
+    assert plugin.carrier.delta == {}
+    assert plugin.version == version
+    saved = json.load(open(tmp_path / "fccargo.json", encoding='utf-8'))
+    assert saved['lastSync'] == plugin.carrier.lastSync != "2025-01-01T00:00:00+00:00"
+
+    plugin.capi_fleetcarrier({**CARRIER, 'cargo': [{'commodity': 'Steel', 'qty': 400}]})
+    assert plugin.carrier.delta == {'steel': -100}
+    assert plugin.version == version + 1
+    assert 'steel' in plugin.carrier.changed
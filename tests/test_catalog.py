@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from ..colonization.catalog import CommodityCatalog
+
+
+def test_cached_catalog_matches_compiled(tmp_path: Path) -> None:
+    fdev = tmp_path / 'FDevIDs'
+    fdev.mkdir()
+    (fdev / 'commodity.csv').write_text("id,symbol,category,name\n1,Steel,Metals,Steel\n2,Gold,Metals,Gold\n")
+    (fdev / 'rare_commodity.csv').write_text("id,symbol,market,category,name\n")
+    plugin_dir = Path(__file__).parent.parent
+
+    compiled = CommodityCatalog(str(plugin_dir), str(tmp_path), str(tmp_path)).load('en')
+    catalog = CommodityCatalog(str(plugin_dir), str(tmp_path), str(tmp_path))
+    cached = catalog.load('en')
+
+    assert catalog.fromCache
+    assert {k: c.to_dict() for k, c in cached.items()} == {k: c.to_dict() for k, c in compiled.items()}
+    assert cached['steel'].market_ord > 0
@@ -1,4 +1,17 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
 from ..colonization.colonization import ColonizationPlugin
+from ..colonization.construction import Construction, ConstructionResource
+from ..colonization.data import Commodity
+from ..colonization.fleetcarrier import FleetCarrier
+from ..colonization.names import CommodityNames
+from ..colonization.pipeline import JournalPipeline
+from ..colonization.storage import JsonStorage
+from .conftest import Config
 
 
 def test_add_construction() -> None:
@@ -7,3 +20,194 @@ def test_add_construction() -> None:
 
     assert plugin.currentConstruction
     assert plugin.currentConstruction.get_name() == "Station"
+
+
+def test_journal_burst_schedules_single_refresh() -> None:
+    scheduled: list[Any] = []
+    plugin = ColonizationPlugin()
+    plugin.ui = Config(frame=Config(after_idle=scheduled.append))  # type: ignore
+    state = {'StationName': None}
+
+    plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'FSDJump'}, state)
+    assert plugin.version == 0
+    plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'MarketBuy', 'Type': 'steel', 'Count': 10}, state)
+    plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'MarketBuy', 'Type': 'steel', 'Count': 5}, state)
+
+    assert plugin.cargo['steel'] == 15
+    assert plugin.version == 2
+    assert len(scheduled) == 1
+
+
+def test_cargo_transfer_saves_carrier_once(tmp_path: Path) -> None:
+    plugin = ColonizationPlugin()
+    plugin.carrier = FleetCarrier()
+    plugin.carrier.load(str(tmp_path / "fccargo.json"))
+    transfers = [{'Type': 'steel', 'Count': 1, 'Direction': 'tocarrier'} for _ in range(20)]
+
+    plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'CargoTransfer', 'Transfers': transfers}, {})
+
+    assert plugin.carrier.get('steel') == 20
+    assert plugin.carrier.avoided_writes == 19
+    assert json.load(open(tmp_path / "fccargo.json", encoding='utf-8'))['cargo'] == {'steel': 20}
+
+
+def test_commodity_names_are_memoised() -> None:
+    names = CommodityNames()
+
+    first = names.symbol('$CMMComposite_name;')
+    second = names.symbol('$CMMComposite_name;')
+
+    assert first == 'cmmcomposite'
+    assert first is second
+    assert names.symbol('Steel') == 'steel'
+    assert (names.hits, names.misses) == (1, 2)
+
+
+def test_journal_pipeline_applies_events_off_thread() -> None:
+    scheduled: list[Any] = []
+    plugin = ColonizationPlugin()
+    plugin.ui = Config(frame=Config(after=lambda ms, func: scheduled.append(func)))  # type: ignore
+    plugin.pipeline.start()
+    state = {'StationName': None, 'Cargo': {}}
+
+    for _ in range(50):
+        plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'MarketBuy', 'Type': 'steel', 'Count': 2}, state)
+    plugin.pipeline.wait()
+    plugin.pipeline.stop()
+
+    assert plugin.cargo['steel'] == 100
+    assert plugin.pipeline.processed == 50
+    assert plugin.version == 50
+    assert len(scheduled) == 1
+
+
+def test_finished_constructions_move_to_archive(tmp_path: Path) -> None:
+    sites = [Construction(system="SYS", station_name=f"Site {i}", market_id=i, construction_complete=i == 2,
+                          construction_failed=i == 3).to_dict() for i in (1, 2, 3)]
+    with open(tmp_path / "constructions.json", 'w', encoding='utf-8') as file:
+        json.dump(sites, file)
+    plugin = ColonizationPlugin()
+    plugin.storage = JsonStorage(str(tmp_path))
+
+    plugin.load()
+    assert [c.market_id for c in plugin.get_archive()] == [2, 3]
+    plugin.persistence.flush()
+
+    assert [c.market_id for c in plugin.constructions] == [1]
+    assert [c.market_id for c in plugin.get_archive()] == [2, 3]
+    assert [c['market_id'] for c in json.load(open(tmp_path / "archive.json", encoding='utf-8'))] == [2, 3]
+    plugin.load()
+    assert plugin._archive is None
+    assert [c.get_name() for c in plugin.get_archive()] == ["Site 2 [complete]", "Site 3 [failed]"]
+
+
+def test_backfill_runs_behind_the_journal_pipeline(tmp_path: Path) -> None:
+    with open(tmp_path / "Journal.2025-04-01T100000.01.log", 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'timestamp': '2025-04-01T10:00:00Z', 'event': 'Loadout', 'Ship': 'type9',
+                               'CargoCapacity': 784}) + '\n')
+        file.write(json.dumps({'timestamp': '2025-04-01T10:01:00Z', 'event': 'Docked', 'StationName': 'Site',
+                               'StarSystem': 'SYS', 'MarketID': 5}) + '\n')
+        file.write(json.dumps({'timestamp': '2025-04-01T10:02:00Z', 'event': 'ColonisationContribution',
+                               'MarketID': 5, 'Contributions': []}) + '\n')
+    scheduled: list[Any] = []
+    plugin = ColonizationPlugin()
+    plugin.ui = Config(frame=Config(after=lambda ms, func: scheduled.append(func)))  # type: ignore
+    plugin.backfill.load(str(tmp_path), str(tmp_path / "backfill.json"))
+    plugin.pipeline.start()
+    imported: list[int] = []
+
+    assert plugin.backfill_journals(imported.append)
+    assert not plugin.backfill_journals(imported.append)
+    plugin.pipeline.wait()
+    plugin.pipeline.stop()
+    plugin.ui = None
+    scheduled.pop()()
+
+    assert imported == [1]
+    assert plugin.backfill.timestamp == '2025-04-01T10:02:00Z'
+
+
+def test_untracked_site_does_not_touch_shared_matrix() -> None:
+    plugin = ColonizationPlugin()
+    plugin.commodityMap = {s: Commodity(s, "Metals", s.title()) for s in ('steel', 'titanium')}
+    plugin.cargo = {'titanium': 30}
+    plugin.colonisation_construction_depot("SYS", "Station", 1, 0.2, False, False, {
+        'steel': ConstructionResource('steel', 100, 40, 1000),
+        'titanium': ConstructionResource('titanium', 50, 0, 1000)})
+
+    table = plugin.get_table()
+
+    assert [(e.commodity.symbol, e.demand, e.buy()) for e in table] == [('steel', 60, 60), ('titanium', 50, 20)]
+    assert not plugin.constructions.matrix.symbols
+
+
+def test_replay_applies_deliveries_missed_before_the_live_session(tmp_path: Path) -> None:
+    with open(tmp_path / "Journal.2025-04-01T100000.01.log", 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'timestamp': '2025-04-01T10:01:00Z', 'event': 'Docked', 'StationName': 'Site',
+                               'StarSystem': 'SYS', 'MarketID': 5}) + '\n')
+        file.write(json.dumps({'timestamp': '2025-04-01T10:02:00Z', 'event': 'ColonisationContribution',
+                               'MarketID': 5, 'Contributions': [{'Name': '$steel_name;', 'Amount': 100}]}) + '\n')
+    plugin = ColonizationPlugin()
+    plugin.constructions.add(Construction(system="SYS", station_name="Site", market_id=5,
+                                          required={'steel': ConstructionResource('steel', 1000, 0, 1000)}))
+    plugin.backfill.load(str(tmp_path), str(tmp_path / "backfill.json"))
+
+    plugin.journal_entry("cmdr", False, "SYS", "", {'timestamp': '2025-04-02T12:00:00Z', 'event': 'MarketBuy',
+                                                    'Type': 'steel', 'Count': 10}, {'StationName': None})
+
+    assert plugin.replay_journals() == 1
+    assert plugin.constructions.get(5).required['steel'].provided == 100
+    assert plugin.replay_journals() == 0
+
+
+def test_live_events_wait_for_a_replay_without_pipeline(tmp_path: Path) -> None:
+    with open(tmp_path / "Journal.2025-04-01T100000.01.log", 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'timestamp': '2025-04-01T10:00:00Z', 'event': 'ColonisationContribution',
+                               'MarketID': 5, 'Contributions': []}) + '\n')
+    plugin = ColonizationPlugin()
+    plugin.backfill.load(str(tmp_path), str(tmp_path / "backfill.json"))
+    imported: list[int] = []
+
+    assert plugin.backfill_journals(imported.append)
+    plugin.journal_entry("cmdr", False, "SYS", "", {'timestamp': '2025-04-02T12:00:00Z', 'event': 'MarketBuy',
+                                                    'Type': 'steel', 'Count': 10}, {'StationName': None})
+    assert 'steel' not in plugin.cargo
+    while not imported:
+        plugin.poll_backfill()
+        time.sleep(0.01)
+
+    assert imported == [1]
+    assert plugin.cargo == {'steel': 10}
+
+
+def test_full_journal_queue_does_not_block_tk_thread() -> None:
+    scheduled: list[Any] = []
+    plugin = ColonizationPlugin()
+    plugin.ui = Config(frame=Config(after=lambda ms, func: scheduled.append(func)))  # type: ignore
+    plugin.pipeline = JournalPipeline(plugin._apply_journal, max_size=2)
+    plugin.pipeline.start()
+    started = threading.Event()
+    release = threading.Event()
+
+    def busy() -> None:
+        started.set()
+        release.wait()
+
+    plugin.pipeline.call(busy)
+    started.wait()
+    state = {'StationName': None, 'Cargo': {}}
+
+    for count in range(1, 6):
+        plugin.journal_entry("cmdr", False, "SYS", "", {'event': 'MarketBuy', 'Type': 'steel', 'Count': count},
+                             state)
+    assert plugin.pipeline.overflows > 0
+    assert len(plugin._held) == 3
+
+    release.set()
+    plugin.ui = None
+    while plugin._held or not plugin.pipeline.idle:
+        plugin._poll_pipeline()
+    plugin.pipeline.stop()
+
+    assert plugin.cargo['steel'] == 15
+    assert plugin.pipeline.processed == 5
@@ -0,0 +1,16 @@
+from config import config as edmc_config
+
+from ..colonization.config import Config, Settings
+
+
+def test_settings_snapshot_is_refreshed_on_change() -> None:
+    settings = Settings()
+    edmc_config.set(Config.ROWS.key, 15)
+    settings.refresh()
+
+    edmc_config.set(Config.ROWS.key, 30)
+    assert settings.rows == 15
+
+    settings[Config.ROWS] = 20
+    assert settings.rows == 20
+    assert edmc_config.get_int(Config.ROWS.key) == 20
@@ -0,0 +1,44 @@
+from ..colonization.construction import Construction, ConstructionRegistry
+from ..colonization.needs import NeedsMatrix
+
+
+def test_registry_navigation_survives_removal() -> None:
+    registry = ConstructionRegistry(Construction(station_name=str(i), market_id=i) for i in range(1, 5))
+
+    registry.remove(2)
+
+    assert len(registry) == 3
+    assert registry.get(2) is None
+    assert [c.market_id for c in registry] == [1, 3, 4]
+    assert registry.next_of(1) is registry.get(3)
+    assert registry.prev_of(3) is registry.get(1)
+    assert registry.next_of(4) is None
+    assert registry.last() is registry.get(4)
+
+
+def test_registry_totals_follow_deliveries() -> None:
+    first = Construction(market_id=1, required={'steel': {'commodity': 'steel', 'required': 100, 'provided': 0, 'payment': 1}})
+    second = Construction(market_id=2, required={'steel': {'commodity': 'steel', 'required': 50, 'provided': 10, 'payment': 1},
+                                                 'water': {'commodity': 'water', 'required': 20, 'provided': 0, 'payment': 1}})
+    registry = ConstructionRegistry([first, second])
+
+    registry.deliver(first, 'steel', 30)
+    assert registry.totals() == {'steel': 110, 'water': 20}
+
+    registry.remove(second)
+    assert registry.totals() == {'steel': 70}
+    assert registry.verify_totals()
+
+
+def test_needs_matrix_grows_and_keeps_rows() -> None:
+    registry = ConstructionRegistry(
+        Construction(market_id=i, required={f'c{j}': {'commodity': f'c{j}', 'required': 10 * i, 'provided': i,
+                                                      'payment': 1} for j in range(i * 30, i * 30 + 40)})
+        for i in range(1, 4))
+
+    registry.remove(1)
+    registry.set_provided(registry.get(3), 'c100', 30)
+
+    assert len(registry.matrix.symbols) > NeedsMatrix.COLUMNS
+    assert registry.verify_totals()
+    assert registry.matrix.total_needed(3) == sum(r.needed() for r in registry.get(3).required.values())
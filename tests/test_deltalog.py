@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from ..colonization.deltalog import DeltaLog
+
+
+def test_torn_last_line_is_truncated(tmp_path: Path) -> None:
+    log = DeltaLog(str(tmp_path / "constructions.log"))
+    log.record({'op': 'remove', 'market_id': 1})
+    log.write(log.take_pending())
+    with open(log.filePath, 'a', encoding='utf-8') as file:
+        file.write('{"op":"deli')
+
+    assert log.read() == [{'op': 'remove', 'market_id': 1}]
+    assert log.size() == len('{"op":"remove","market_id":1}\n')
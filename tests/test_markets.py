@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+
+from ..colonization.markets import MarketCache
+
+
+def test_least_recently_used_market_is_evicted() -> None:
+    markets = MarketCache(max_size=2)
+    markets.put(1, ['steel'])
+    markets.put(2, ['titanium'])
+    assert markets.get(1) == {'steel'}
+
+    markets.put(3, ['polymers'])
+
+    assert len(markets) == 2
+    assert markets.get(2) == frozenset()
+    assert markets.get(1) == {'steel'}
+    assert markets.get(3) == {'polymers'}
+
+
+def test_expired_market_is_dropped() -> None:
+    markets = MarketCache(ttl=60)
+    markets.put(1, ['steel'], time.time() - 120)
+    markets.put(2, ['titanium'], time.time() - 30)
+
+    assert markets.get(2) == {'titanium'}
+    assert markets.get(1) == frozenset()
+    assert len(markets) == 1
+
+
+def test_markets_survive_save_and_load(tmp_path: Path) -> None:
+    markets = MarketCache()
+    markets.load(str(tmp_path / "markets.json"))
+    markets.put(1, ['steel', 'aluminium'])
+    markets.put(2, ['titanium'])
+
+    loaded = MarketCache()
+    loaded.load(str(tmp_path / "markets.json"))
+
+    assert len(loaded) == 2
+    assert loaded.get(1) == {'steel', 'aluminium'}
+    assert loaded.get(2) == {'titanium'}
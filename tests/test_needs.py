@@ -0,0 +1,37 @@
+import pytest
+
+from ..colonization import needs
+from ..colonization.construction import ConstructionResource
+from ..colonization.needs import NeedsMatrix
+
+
+def make_matrix() -> NeedsMatrix:
+    matrix = NeedsMatrix()
+    for key in range(1, 4):
+        matrix.set_row(key, {symbol: ConstructionResource(symbol, 1000 * key + i, 100 * i, 1000)
+                             for i, symbol in enumerate(('steel', 'aluminium', 'titanium')[:key])})
+    matrix.set_provided(2, 'steel', 1500)
+    return matrix
+
+
+def results(matrix: NeedsMatrix) -> list:
+    cargo = matrix.vector({'steel': 200, 'titanium': 5000})
+    carrier = matrix.vector({'aluminium': 300})
+    out = []
+    for key in (None, 1, 2, 3):
+        needed = matrix.needed(key)
+        out.append((list(needed), matrix.total_needed(key),
+                    matrix.buy(matrix.columns(key), needed, cargo, carrier)))
+    return out
+
+
+def test_numpy_and_array_paths_agree(monkeypatch: pytest.MonkeyPatch) -> None:
+    numpy = pytest.importorskip("numpy")
+    matrix = make_matrix()
+
+    monkeypatch.setattr(needs, 'numpy', numpy)
+    vectorised = results(matrix)
+    monkeypatch.setattr(needs, 'numpy', None)
+    plain = results(matrix)
+
+    assert vectorised == plain
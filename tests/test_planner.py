@@ -0,0 +1,24 @@
+from ..colonization.planner import HaulPlanner
+
+
+def test_exact_search_improves_first_fit() -> None:
+    planner = HaulPlanner()
+    needs = {'a': 4, 'b': 4, 'c': 3, 'd': 3, 'e': 3, 'f': 3}
+
+    plan = planner.plan(needs, {}, {}, 10)
+
+    assert len(plan) == 2
+    assert plan.optimal
+    assert all(sum(load.tons for load in trip) <= 10 for trip in plan.trips)
+
+
+def test_plan_splits_carrier_and_cargo_and_is_cached() -> None:
+    planner = HaulPlanner()
+    needs = {'steel': 1000, 'aluminium': 300}
+
+    plan = planner.plan(needs, {'steel': 200}, {'aluminium': 100}, 784)
+
+    assert plan.tons == 1200
+    assert len(plan) == 2
+    assert planner.plan(needs, {'steel': 200}, {'aluminium': 100}, 784) is plan
+    assert (planner.solves, planner.hits) == (1, 1)
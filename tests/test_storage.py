@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from ..colonization.construction import Construction, ConstructionResource, ConstructionRegistry
+from ..colonization.storage import JsonStorage, SqliteStorage, Storage
+
+
+def make_construction(market_id: int) -> Construction:
+    return Construction(system="SYS", station_name=f"Site {market_id}", market_id=market_id,
+                        required={'steel': ConstructionResource('steel', 1000, 100, 1000),
+                                  'aluminium': ConstructionResource('aluminium', 500, 0, 1000)})
+
+
+def test_sqlite_migrates_json_and_records_deliveries(tmp_path: Path) -> None:
+    legacy = JsonStorage(str(tmp_path))
+    legacy.write(legacy.take(ConstructionRegistry([make_construction(1), make_construction(2)]), True))
+    legacy.save_carrier({'callSign': "ABC-123", 'cargo': {'steel': 50}})
+
+    storage = SqliteStorage(str(tmp_path))
+    registry = storage.load()
+    assert [c.market_id for c in registry] == [1, 2]
+    assert storage.load_carrier() == {'callSign': "ABC-123", 'cargo': {'steel': 50}}
+
+    storage.record({'op': 'deliver', 'market_id': 1, 'commodity': 'steel', 'provided': 300, 'quantity': 200,
+                    'time': "2025-01-01T10:00:00Z"})
+    storage.record({'op': 'remove', 'market_id': 2})
+    storage.write(storage.take(registry, False))
+    storage.close()
+
+    storage = SqliteStorage(str(tmp_path))
+    registry = storage.load()
+    assert [c.market_id for c in registry] == [1]
+    assert registry.get(1).required['steel'].provided == 300
+    assert storage.deliveries(1) == [(1, 'steel', 200, 300, "2025-01-01T10:00:00Z")]
+    assert storage.deliveries(since="2025-01-02T00:00:00Z") == []
+    storage.close()
+
+    with open(tmp_path / "constructions.json", encoding='utf-8') as file:
+        assert len(json.load(file)) == 2
+
+
+def test_incomplete_backend_fails_on_creation(tmp_path: Path) -> None:
+    class ReadOnlyStorage(JsonStorage):
+        save_carrier = Storage.save_carrier
+
+    with pytest.raises(TypeError):
+        ReadOnlyStorage(str(tmp_path))
@@ -0,0 +1,50 @@
+from ..colonization.telemetry import DeliveryRing, DeliveryTelemetry
+
+
+def test_ring_keeps_only_latest_deliveries() -> None:
+    ring = DeliveryRing(4)
+    for i in range(10):
+        ring.add(float(i), 'steel', i)
+
+    assert len(ring) == 4
+    assert [tons for _, _, tons in ring.entries()] == [6, 7, 8, 9]
+
+
+def test_estimate_rate_eta_and_bottlenecks() -> None:
+    telemetry = DeliveryTelemetry(size=8, window=3600 * 6)
+    now = 100000.0
+    telemetry.record(1, 'steel', 1000, now - 3600)
+    telemetry.record(1, 'aluminium', 500, now - 1800)
+    telemetry.record(2, 'steel', 9000, now - 60)
+    telemetry.record(1, 'steel', 5000, now - 3600 * 7)
+
+    estimate = telemetry.estimate({'steel': 3000, 'aluminium': 3000, 'polymers': 100}, 1, now)
+    assert estimate.rate == 250
+    assert estimate.remaining == 6100
+    assert estimate.eta == 6100 / 250 * 3600
+    assert estimate.bottlenecks == ['polymers', 'aluminium', 'steel']
+
+    assert telemetry.rates(now=now)[0] == 1750
+    telemetry.remove(2)
+    assert telemetry.rates(now=now)[0] == 250
+
+
+def test_rate_of_a_new_site_spans_its_tracking_time() -> None:
+    telemetry = DeliveryTelemetry(window=3600 * 6)
+    now = 100000.0
+    telemetry.observe(1, {}, now - 3600 * 2)
+    telemetry.record(1, 'steel', 1000, now - 60)
+
+    assert telemetry.rates(1, now)[0] == 500
+
+
+def test_progress_after_a_long_absence_is_not_a_delivery() -> None:
+    telemetry = DeliveryTelemetry(window=3600 * 6)
+    now = 100000.0
+    telemetry.observe(1, {}, now - 3 * 24 * 3600)
+    telemetry.observe(1, {'steel': 50000}, now)
+
+    assert telemetry.estimate({'steel': 1000}, 1, now).eta is None
+
+    telemetry.observe(1, {'steel': 600}, now + 1800)
+    assert telemetry.rates(1, now + 1800)[0] == 100
@@ -0,0 +1,57 @@
+from colonization.data import Commodity, TableEntry
+from colonization.ui import CollapseMode, SortingMode
+
+from .benchmark.headless import HeadlessUi
+
+
+def make_table() -> list[TableEntry]:
+    table = []
+    for i, symbol in enumerate(('aluminium', 'steel', 'titanium')):
+        commodity = Commodity(symbol, "Metals", symbol.title())
+        commodity.market_ord = i
+        table.append(TableEntry(commodity, 100 * (i + 1), 10, 0, False))
+    return table
+
+
+def test_view_is_rebuilt_only_when_its_key_changes() -> None:
+    ui = HeadlessUi()
+    built: list[list[TableEntry]] = []
+
+    def get_table() -> list[TableEntry]:
+        built.append(make_table())
+        return built[-1]
+
+    ui.set_table(get_table, None, False, 1)
+    ui.set_table(get_table, None, False, 1)
+    assert len(built) == 1
+    assert ui.view_builds == 1
+
+    ui.sorting_mode = SortingMode.ALPHABET
+    ui.set_table(get_table, None, False, 1)
+    assert len(built) == 2
+    assert ui.view_builds == 2
+
+    ui.sorting_mode = SortingMode.MARKET
+    ui.set_table(get_table, None, False, 1)
+    ui.categories["Metals"].collapsed = CollapseMode.COLLAPSED
+    ui.set_table(get_table, None, False, 1)
+    assert len(built) == 4
+    assert ui.view_builds == 4
+
+    ui.set_table(get_table, None, False, 2)
+    assert len(built) == 5
+
+
+def test_render_only_touches_changed_cells() -> None:
+    ui = HeadlessUi()
+    table = make_table()
+    ui.set_table(table, None, False)
+    assert ui.tk_ops > 0
+
+    ui.set_table(table, None, False)
+    assert ui.tk_ops == 0
+
+    table[1].cargo = 20
+    ui.set_table(table, None, False)
+    assert ui.tk_ops == 1
+    assert ui.rows[2]['cargo']['text'] == '{:8,d}'.format(20)